@@ -0,0 +1,128 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Channel modes understood by compute_spectra
+CHANNEL_MODES = ("mono", "stereo", "mid_side")
+
+PRECOMPUTE_BLOCK = 1024  # Frames per vectorized pass when precomputing a track, bounds the temporary memory
+
+# Function to load the decoded samples without collapsing the channels
+def load_channels(audio_segment, normalize: bool = True) -> np.ndarray:
+    """Returns samples shaped (num_samples, channels) as a view of one float buffer."""
+    audio_data = np.asarray(audio_segment.get_array_of_samples(), dtype=np.float32)
+
+    # Normalize audio data
+    max_amplitude = np.max(np.abs(audio_data)) if len(audio_data) else 0
+    if normalize and max_amplitude > 0:
+        audio_data /= max_amplitude
+
+    # Reshaping interleaved samples is free, no per-channel copy is made
+    return audio_data.reshape((-1, audio_segment.channels))
+
+# Function to slice one analysis frame out of the interleaved samples
+def channel_frames(audio_data: np.ndarray, start: int, frame_size: int) -> np.ndarray:
+    """Returns a (channels, frame_size) strided view starting at sample `start`."""
+    return audio_data[start:start + frame_size].T
+
+# Function to normalize magnitudes the same way every style always has
+def normalize_magnitude(fft_magnitude: np.ndarray) -> np.ndarray:
+    """Applies logarithmic scaling and normalizes each row to its own maximum."""
+    fft_magnitude = np.log1p(fft_magnitude)
+    max_magnitude = np.max(fft_magnitude, axis=-1, keepdims=True)
+    np.divide(fft_magnitude, max_magnitude, out=fft_magnitude, where=max_magnitude > 0)
+    return fft_magnitude
+
+# Function to compute the spectra of all channels in one FFT call
+def compute_spectra(frames: np.ndarray, mode: str = "mono") -> np.ndarray:
+    """Returns normalized magnitudes for a (channels, frame_size) frame, or a (frames, channels, frame_size) block.
+
+    "mono" returns one row, equal to the spectrum of the channel average.
+    "stereo" returns one row per channel and "mid_side" returns mid and side rows.
+    """
+    if mode not in CHANNEL_MODES:
+        raise ValueError(f"Unknown channel mode: {mode}")
+
+    frame_size = frames.shape[-1]
+    fft_data = np.fft.rfft(frames, axis=-1)[..., :frame_size // 2]
+
+    # The FFT is linear, so channel mixes are taken on the spectra instead of the samples
+    fft_data = _mix_channels(fft_data, mode)
+
+    return normalize_magnitude(np.abs(fft_data))
+
+# Function to mix channel spectra the same way compute_spectra does
+def _mix_channels(fft_data: np.ndarray, mode: str) -> np.ndarray:
+    if mode == "mono":
+        return fft_data.mean(axis=-2)
+    if mode == "mid_side" and fft_data.shape[-2] > 1:
+        left, right = fft_data[..., 0, :], fft_data[..., 1, :]
+        return np.stack(((left + right) / 2, (left - right) / 2), axis=-2)
+    return fft_data
+
+# Class to look analysis frames up by time instead of consuming them
+class AnalysisStore:
+    """Indexes the analysis frames of a track by timestamp.
+
+    Frame i starts at sample int(i * hop_size), so seeking is arithmetic and any
+    frame can be read without touching the frames before it. The hop may be
+    fractional, e.g. sample_rate / fps to get exactly one frame per video frame.
+    """
+
+    def __init__(self, audio_data: np.ndarray, sample_rate: int, frame_size: int = 1024,
+                 hop_size: float = None) -> None:
+        self.audio_data = audio_data
+        self.sample_rate = sample_rate
+        self.frame_size = frame_size
+        self.hop_size = hop_size or frame_size
+        self.frame_count = max(int((len(audio_data) - frame_size) // self.hop_size) + 1, 0)
+        self.tracks = {}  # Precomputed per-frame parameters by name
+
+    @property
+    def duration(self) -> float:
+        """Length of the track in seconds."""
+        return len(self.audio_data) / self.sample_rate
+
+    def index_at(self, seconds: float) -> int:
+        """Returns the index of the frame playing at `seconds`, clamped to the track."""
+        index = int(int(seconds * self.sample_rate) // self.hop_size)
+        return min(max(index, 0), self.frame_count)
+
+    def time_of(self, index: int) -> float:
+        """Returns the timestamp in seconds where frame `index` starts."""
+        return index * self.hop_size / self.sample_rate
+
+    def frame(self, index: int) -> np.ndarray:
+        """Returns frame `index` as a (channels, frame_size) view."""
+        return channel_frames(self.audio_data, int(index * self.hop_size), self.frame_size)
+
+    def spectrum(self, index: int, mode: str = "mono") -> np.ndarray:
+        """Returns the normalized spectrum of frame `index`."""
+        return compute_spectra(self.frame(index), mode)
+
+    def frames(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Returns frames `start` to `stop` as one (frames, channels, frame_size) array.
+
+        With a whole-sample hop this is a strided view; a fractional hop isn't a
+        stride, so those frames are gathered into a copy.
+        """
+        stop = self.frame_count if stop is None else min(stop, self.frame_count)
+        if self.frame_count == 0:
+            return np.zeros((0, self.audio_data.shape[1], self.frame_size), dtype=self.audio_data.dtype)
+        windows = sliding_window_view(self.audio_data, self.frame_size, axis=0)
+        if self.hop_size % 1:
+            return windows[(np.arange(start, stop) * self.hop_size).astype(np.int64)]
+        return windows[::int(self.hop_size)][start:stop]
+
+    def precompute(self, name: str, function, block: int = PRECOMPUTE_BLOCK) -> np.ndarray:
+        """Returns function(frames) for every frame of the track, computed once and kept under `name`.
+
+        `function` takes a (frames, channels, frame_size) block and returns one row
+        per frame, so the whole track is derived in a few vectorized passes and the
+        render loop only indexes the result.
+        """
+        track = self.tracks.get(name)
+        if track is None:
+            starts = range(0, self.frame_count, block) if self.frame_count else [0]
+            track = np.concatenate([function(self.frames(start, start + block)) for start in starts])
+            self.tracks[name] = track
+        return track
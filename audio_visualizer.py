@@ -1,19 +1,47 @@
 import numpy as np
 import pygame
 from pydub import AudioSegment
-from moviepy.editor import ImageSequenceClip
+from audio_analysis import load_channels, AnalysisStore
+from feature_graph import FeatureGraph
+from playback import PcmPlayer, pcm_from_segment
+from sprite_cache import SpriteCache
+from palette import Palette
+from frame_cache import FrameCache
+from tile_render import TileRenderer
+from background_export import BackgroundExport, open_writer
+from memory_profile import MemoryProfiler
 import os
 
 # Constants
 SCREEN_WIDTH = 1080
 SCREEN_HEIGHT = 1080
 FRAME_SIZE = 1024
+FPS = 30  # Video frame rate, every frame shows the analysis frame starting at its own timestamp
+START_TIME = 0  # Seconds into the track where playback and rendering start
 BASE_RADIUS = 50
 MAX_WAVE_RADIUS = 250
 POWER = 1.5
 NUM_DOTS = 50
 MIN_DOT_RADIUS = 2
 MAX_DOT_RADIUS = 4
+PREVIEW_SCALE = 0.5  # Window scale; below 1 the full-resolution export renders in a background process
+OUTPUT_FILE = "cha_visualization.mp4"
+EXPORT_FORMAT = "mp4"  # "mp4", "png" (numbered lossless frames) or "raw" (headerless RGB frames)
+MEMORY_PROFILE = False  # Record per-stage memory use to memory_report.json
+MEMORY_BUDGET_MB = None  # Stop with an error instead of swapping once RSS passes this many MB
+FRAME_CACHE_MB = None  # Memory for whole frames reused when the dot state repeats, None redraws every frame
+EXPORT_TILES = False  # Rasterize background export frames as tiles on every core, worth it at 4K and 8K
+
+# Dot placement never changes, only the radius does
+DOT_ANGLES = (2 * np.pi / NUM_DOTS) * np.arange(NUM_DOTS)
+DOT_COS = np.cos(DOT_ANGLES)
+DOT_SIN = np.sin(DOT_ANGLES)
+DOT_SPRITES = SpriteCache()  # Pre-rendered dots, reused across frames
+
+# The dots only react to the energy of the lowest bins
+LOW_BAND = f"low_band_energy:{(FRAME_SIZE // 2) // (NUM_DOTS // 2)}"
+FEATURE_GRAPH = FeatureGraph([LOW_BAND], FRAME_SIZE)
+PROFILER = MemoryProfiler(enabled=MEMORY_PROFILE, budget_mb=MEMORY_BUDGET_MB)
 
 def get_gradient_color(value: float) -> tuple:
     value = min(max(value, 0), 1)
@@ -22,93 +50,150 @@ def get_gradient_color(value: float) -> tuple:
     b = 255
     return (r, g, b)
 
-def draw_dots_circle(screen: pygame.Surface, samples: np.ndarray) -> None:
-    fft_data = np.fft.fft(samples)
-    fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
-    fft_magnitude = np.log1p(fft_magnitude)
-    max_magnitude = np.max(fft_magnitude)
-    if max_magnitude > 0:
-        fft_magnitude /= max_magnitude
+DOT_PALETTE = Palette(get_gradient_color)  # get_gradient_color baked into a lookup table
+FRAMES = FrameCache(FRAME_CACHE_MB) if FRAME_CACHE_MB else None  # Rendered frames by dot state, per surface size
+TILES = TileRenderer()  # Thread pool for tiled export frames, started on first use
+
+def video_store(audio_data: np.ndarray, sample_rate: int) -> AnalysisStore:
+    """Returns a store with one analysis frame per video frame, so frame i shows time i / FPS."""
+    return AnalysisStore(audio_data, sample_rate, FRAME_SIZE, hop_size=sample_rate / FPS)
+
+def dot_parameters(frames: np.ndarray) -> np.ndarray:
+    """Returns a (wave_radius, color_index) row per frame of a (frames, channels, frame_size) block."""
+    average_magnitude = FEATURE_GRAPH.compute(frames)[LOW_BAND]
+    wave_radius = (BASE_RADIUS + (average_magnitude ** POWER) * (MAX_WAVE_RADIUS - BASE_RADIUS)).astype(int)
+    return np.column_stack((wave_radius, DOT_PALETTE.indices(average_magnitude)))
+
+def layout_dots(size: tuple, parameters: np.ndarray) -> list:
+    """Returns the (sprite, position) blits of every dot for a surface of `size`."""
+    # Sizes are defined at full resolution and scaled to the target surface
+    width, height = size
+    scale = width / SCREEN_WIDTH
+
+    center_x = width // 2
+    center_y = height // 2
+    wave_radius, color_index = parameters.tolist()
+
+    # Every dot shares one radius and color, so all of them are blitted from one sprite
+    dot_radius = MIN_DOT_RADIUS + (wave_radius / MAX_WAVE_RADIUS) * (MAX_DOT_RADIUS - MIN_DOT_RADIUS)
+    dot_radius = max(int(dot_radius * scale), 1)
+    xs = (center_x + wave_radius * scale * DOT_COS).astype(int).tolist()
+    ys = (center_y + wave_radius * scale * DOT_SIN).astype(int).tolist()
+    sprite = DOT_SPRITES.get(dot_radius, DOT_PALETTE.color_at(color_index))
+    return [(sprite, (x - dot_radius, y - dot_radius)) for x, y in zip(xs, ys)]
+
+def draw_dots_circle(screen: pygame.Surface, parameters: np.ndarray) -> None:
+    state = tuple(parameters.tolist())  # The whole frame follows from the radius and the palette entry
+    if FRAMES is not None and FRAMES.restore(screen, state):
+        return
 
     screen.fill((0, 0, 0))
-    center_x = SCREEN_WIDTH // 2
-    center_y = SCREEN_HEIGHT // 2
-    average_magnitude = np.mean(fft_magnitude[:len(fft_magnitude) // (NUM_DOTS // 2)])
-    wave_radius = int(BASE_RADIUS + (average_magnitude ** POWER) * (MAX_WAVE_RADIUS - BASE_RADIUS))
+    screen.blits(layout_dots(screen.get_size(), parameters), doreturn=False)
+    if FRAMES is not None:
+        FRAMES.store(screen, state)
 
-    for i in range(NUM_DOTS):
-        angle = (2 * np.pi / NUM_DOTS) * i
-        dot_radius = MIN_DOT_RADIUS + (wave_radius / MAX_WAVE_RADIUS) * (MAX_DOT_RADIUS - MIN_DOT_RADIUS)
-        x = center_x + (wave_radius * np.cos(angle))
-        y = center_y + (wave_radius * np.sin(angle))
-        dot_color = get_gradient_color(average_magnitude)
-        pygame.draw.circle(screen, dot_color, (int(x), int(y)), int(dot_radius))
-
-    pygame.display.flip()
+# Function to draw a full-resolution export frame on every core
+def draw_dots_tiled(screen: pygame.Surface, parameters: np.ndarray) -> None:
+    """Same frame as draw_dots_circle, rasterized as tiles on a thread pool."""
+    TILES.render(screen, (0, 0, 0), layout_dots(screen.get_size(), parameters))
 
 def main() -> None:
+    export = None
     try:
         audio_file = r"C:\Users\audio.mp3" #Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-        
-        if audio_segment.channels > 1:
-            audio_data = np.array(audio_segment.get_array_of_samples()).reshape((-1, audio_segment.channels)).mean(axis=1)
-        else:
-            audio_data = np.array(audio_segment.get_array_of_samples())
+        with PROFILER.stage("decode"):
+            audio_segment = AudioSegment.from_file(audio_file)
 
-        audio_data = audio_data.astype(np.float32)
-        audio_data /= np.max(np.abs(audio_data))
+        with PROFILER.stage("normalize"):
+            audio_data = load_channels(audio_segment)
+        store = video_store(audio_data, audio_segment.frame_rate)  # Frames are looked up by time
+        with PROFILER.stage("analysis"):
+            dot_track = store.precompute("dots", dot_parameters)  # Every frame's dots, in a few vectorized passes
+        position = store.index_at(START_TIME)
 
         pygame.init()
-        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        screen = pygame.display.set_mode((int(SCREEN_WIDTH * PREVIEW_SCALE), int(SCREEN_HEIGHT * PREVIEW_SCALE)))
         pygame.display.set_caption("Circular Dots Audio Spectrum")
         clock = pygame.time.Clock()
 
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples instead of decoding the file a second time
+        player = PcmPlayer(audio_segment.frame_rate, audio_segment.channels)
+        player.play(pcm_from_segment(audio_segment, player.sample_rate, player.channels), store.time_of(position))
+
+        # Image sequences go to a folder named after the video
+        output = OUTPUT_FILE if EXPORT_FORMAT == "mp4" else os.path.splitext(OUTPUT_FILE)[0] + "_frames"
+
+        # Either render full resolution in the background, or capture the window itself
+        if PREVIEW_SCALE < 1:
+            export_draw = draw_dots_tiled if EXPORT_TILES else draw_dots_circle
+            export = BackgroundExport(export_draw, (SCREEN_WIDTH, SCREEN_HEIGHT), output, fps=FPS,
+                                      export_format=EXPORT_FORMAT, start_time=store.time_of(position),
+                                      audio_file=audio_file)
+            PROFILER.on_exceeded(export.terminate)  # finish() waits in one long stage, stop the workers on an overrun
+        else:
+            export = open_writer(output, (SCREEN_WIDTH, SCREEN_HEIGHT), FPS, EXPORT_FORMAT, store.time_of(position),
+                                 audio_file)
 
-        frames = []
         running = True
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
 
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]
-                draw_dots_circle(screen, frame)
-
-                # Capture the current screen and append it to frames
-                frame_data = pygame.surfarray.array3d(screen)
-                frames.append(frame_data)
+            if position < store.frame_count:
+                parameters = dot_track[position]
+                position += 1  # Advance to the next frame
+                with PROFILER.stage("render"):
+                    draw_dots_circle(screen, parameters)
+                    pygame.display.flip()
+
+                # Hand the frame to the exporter, frames are streamed rather than kept
+                if isinstance(export, BackgroundExport):
+                    with PROFILER.stage("capture"):
+                        export.submit(parameters)
+                else:
+                    with PROFILER.stage("capture"):
+                        frame_data = pygame.image.tostring(screen, "RGB")
+                    with PROFILER.stage("encode"):
+                        export.write_frame(frame_data)
 
             else:
                 running = False
 
-            clock.tick(30)
+            clock.tick(FPS)
 
         pygame.quit()
-
-        # Convert frames to video
-        if frames:  # Ensure there are frames to write
-            frames = [np.rot90(frame) for frame in frames]
-            output_file = "cha_visualization.mp4"
-            clip = ImageSequenceClip(frames, fps=30)
-            clip.write_videofile(output_file, codec="libx264")
+        if FRAMES is not None:
+            print(FRAMES.summary())
+
+        # Finish the video
+        if export.frame_count > 0:  # Ensure there are frames to write
+            with PROFILER.stage("encode"):
+                if isinstance(export, BackgroundExport):
+                    print("Waiting for the full-resolution export to finish...")
+                    saved = export.finish()
+                else:
+                    export.close()  # Raises if ffmpeg failed
+                    saved = True
+            export = None  # Finished, nothing left to cancel
 
             # Indicate successful download
-            if os.path.exists(output_file):
-                print(f"Video saved as {output_file}. You can download it from your current working directory.")
+            if saved and os.path.exists(output):
+                print(f"{'Video' if EXPORT_FORMAT == 'mp4' else 'Frames'} saved as {output}. You can download it from your current working directory.")
             else:
                 print("Failed to save the video.")
         else:
+            export.cancel()
+            export = None
             print("No frames were captured. Video was not saved.")
 
     except Exception as e:
         print(f"An error occurred: {e}")
         pygame.quit()
+    finally:
+        if export is not None:
+            export.cancel()  # Stop the render and encode processes or ffmpeg instead of leaving them running
+        PROFILER.write_report()
 
 if __name__ == "__main__":
     main()
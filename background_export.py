@@ -0,0 +1,154 @@
+import multiprocessing
+import signal
+import pygame
+from frame_ring import FrameRing
+from video_encoder import VideoWriter
+from image_sequence import ImageSequenceWriter
+
+RING_SLOTS = 8  # Frames that can be rendered ahead of the encoder
+WORKER_POLL_SECONDS = 0.5  # How often finish() checks that both workers are still alive while it waits
+WORKER_EXIT_SECONDS = 5  # Time the renderer gets to exit after the encoder has written its last frame
+EXPORT_FORMATS = ("mp4", "png", "raw")
+
+# Function to open the writer for an export format
+def open_writer(output_file: str, size: tuple, fps: int = 30, export_format: str = "mp4", start_time: float = 0.0,
+                audio_file: str = None, planar: bool = False):
+    """Returns a VideoWriter for "mp4", or an ImageSequenceWriter for "png" and "raw" frames.
+
+    The audio of `audio_file`, from `start_time` on, is muxed into "mp4" exports only.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == "mp4":
+        return VideoWriter(output_file, size, fps, audio_file=audio_file, audio_offset=start_time, planar=planar)
+    return ImageSequenceWriter(output_file, size, fps, export_format, start_time)
+
+# Function run inside the render process
+def _render_worker(frame_queue, ring: FrameRing, draw_function, size: tuple) -> None:
+    """Renders every queued analysis frame at full resolution straight into the ring."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)  # SDL's handler, if a style initializes it, ignores terminate()
+
+    # One off-screen surface per slot, backed by the shared memory itself
+    surfaces = [pygame.image.frombuffer(ring.buffer(slot), size, "RGB") for slot in range(ring.slots)]
+    try:
+        while True:
+            analysis = frame_queue.get()
+            if analysis is None:
+                break
+            slot = ring.acquire()  # Blocks while the encoder is RING_SLOTS frames behind
+            draw_function(surfaces[slot], analysis)
+            ring.publish(slot)
+    finally:
+        ring.finish()
+
+# Function run inside the encode process
+def _encode_worker(ring: FrameRing, size: tuple, output_file: str, fps: int, export_format: str, start_time: float,
+                   audio_file: str) -> None:
+    """Hands rendered slots to the writer in order and frees them."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # This process has a core to itself, so it converts to YUV while ffmpeg encodes the previous frame
+    with open_writer(output_file, size, fps, export_format, start_time, audio_file, planar=True) as writer:
+        while True:
+            slot = ring.take()
+            if slot is None:
+                break
+            writer.write_frame(ring.buffer(slot))
+            ring.release(slot)
+
+# Class to export the full-resolution video while the window shows a preview
+class BackgroundExport:
+    """Feeds the analysis stream to a render process and a separate encode process.
+
+    The preview loop only queues the analysis of each frame, so it keeps its own
+    pace: the queue is unbounded, each entry being a few numbers. Rendered frames
+    reach the encoder through a FrameRing in shared memory, so render and encode
+    overlap and the export runs at the speed of the slower one. If either worker
+    dies, submit() raises instead of queueing frames nobody will render.
+
+    The workers are spawned rather than forked, since SDL doesn't survive being
+    forked from a process that loaded it, so `draw_function` must be importable
+    from its module.
+    """
+
+    def __init__(self, draw_function, size: tuple, output_file: str, fps: int = 30,
+                 export_format: str = "mp4", start_time: float = 0.0, audio_file: str = None) -> None:
+        width, height = size
+        self.output_file = output_file
+        self.frame_count = 0
+        self.closed = False
+        context = multiprocessing.get_context("spawn")
+        self.frame_queue = context.Queue()
+        self.ring = FrameRing((height, width, 3), RING_SLOTS, context=context)
+        self.render_process = context.Process(
+            target=_render_worker,
+            args=(self.frame_queue, self.ring, draw_function, size),
+            daemon=True,
+        )
+        self.encode_process = context.Process(
+            target=_encode_worker,
+            args=(self.ring, size, output_file, fps, export_format, start_time, audio_file),
+            daemon=True,
+        )
+        try:
+            self.render_process.start()
+            self.encode_process.start()
+        except Exception:
+            self.cancel()  # e.g. a draw function that can't be pickled, don't leak the shared memory
+            raise
+
+    def _dead_worker(self):
+        """Returns the name of a worker that has stopped, or None while both run."""
+        for name, process in (("render", self.render_process), ("encode", self.encode_process)):
+            if not process.is_alive():
+                return name
+        return None
+
+    def submit(self, analysis) -> None:
+        """Queues the analysis of one frame for the render process, raising RuntimeError if a worker has died."""
+        dead = self._dead_worker()
+        if dead is not None:
+            process = self.render_process if dead == "render" else self.encode_process
+            raise RuntimeError(f"The {dead} process of the export stopped (exit code {process.exitcode}), "
+                               f"{self.output_file} can't be finished")
+        self.frame_queue.put(analysis)
+        self.frame_count += 1
+
+    def finish(self) -> bool:
+        """Waits for the queued frames to be rendered and encoded and returns True on success."""
+        if self.render_process.is_alive():
+            self.frame_queue.put(None)
+        while self.encode_process.is_alive():
+            self.encode_process.join(WORKER_POLL_SECONDS)
+            if not self.render_process.is_alive() and self.render_process.exitcode != 0:
+                self.encode_process.terminate()  # The renderer died, nothing will end the encoder's wait
+        if self.encode_process.exitcode == 0:
+            self.render_process.join(WORKER_EXIT_SECONDS)  # It published its last frame and is shutting down
+        if self.render_process.is_alive():
+            self.render_process.terminate()  # The encoder failed, nothing would free a slot again
+        self.render_process.join()
+        success = self.render_process.exitcode == 0 and self.encode_process.exitcode == 0
+        self._close()
+        return success
+
+    def terminate(self) -> None:
+        """Stops both processes at once, safe to call from another thread; finish() then returns False."""
+        for process in (self.render_process, self.encode_process):
+            if process.pid is not None:
+                process.terminate()
+
+    def cancel(self) -> None:
+        """Stops both processes without finishing the file."""
+        for process in (self.render_process, self.encode_process):
+            if process.pid is not None:  # Started
+                process.terminate()
+                process.join()
+        self._close()
+
+    def _close(self) -> None:
+        """Frees the queue and the shared memory, once."""
+        if self.closed:
+            return
+        self.closed = True
+        self.frame_queue.cancel_join_thread()  # Frames nobody will read must not block the exit
+        self.frame_queue.close()
+        self.ring.close(unlink=True)
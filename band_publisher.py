@@ -0,0 +1,230 @@
+import base64
+import hashlib
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+import numpy as np
+
+BANDS = 16  # Log-spaced bands per message
+BAND_FEATURE = f"log_bands:{BANDS}"  # Add this to a style's FeatureGraph to publish it
+PORT = 8765
+CLIENT_QUEUE = 8  # Messages a subscriber may fall behind before it is dropped
+SEND_BUFFER = 4096  # Small kernel buffer, so a stalled subscriber can't hide minutes of messages in it
+BEAT_FLAG = 1
+
+# Every message is this header followed by `band count` bytes, one 0-255 energy per band:
+# magic b"BAND", frame number (uint32), track position in seconds (float32, or seconds since the first frame
+# when the style passes no time), flags (uint8, bit 0 = beat), band count (uint8)
+HEADER = struct.Struct("<4sIfBB")
+MAGIC = b"BAND"
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Class to flag beats in a stream of band energies
+class BeatDetector:
+    """Flags a beat when the bass energy jumps above its average over the last `history` seconds.
+
+    The history is kept by timestamp, so it spans the same time at any frame rate.
+    No beat is flagged within `min_gap` seconds of the last one, so a kick that
+    keeps rising over several frames counts once.
+    """
+
+    def __init__(self, history: float = 1.0, threshold: float = 1.4, bass_bands: int = 2,
+                 min_gap: float = 0.12) -> None:
+        self.history = history
+        self.threshold = threshold
+        self.bass_bands = bass_bands
+        self.min_gap = min_gap
+        self.energies = deque()  # (seconds, energy) of the frames in the history
+        self.previous = 0.0
+        self.last_beat = None
+
+    def update(self, bands: np.ndarray, seconds: float) -> bool:
+        """Adds the bands of the frame at `seconds` and returns True if it starts a beat."""
+        if self.energies and seconds < self.energies[-1][0]:
+            self.energies.clear()  # Time went backwards, e.g. a seek, so the history no longer applies
+            self.last_beat = None
+        while self.energies and self.energies[0][0] <= seconds - self.history:
+            self.energies.popleft()
+
+        energy = float(np.mean(bands[:self.bass_bands]))
+        average = sum(e for _, e in self.energies) / len(self.energies) if self.energies else energy
+        self.energies.append((seconds, energy))
+        beat = (energy > self.threshold * average and energy > self.previous  # Only the rising edge
+                and (self.last_beat is None or seconds - self.last_beat >= self.min_gap))
+        if beat:
+            self.last_beat = seconds
+        self.previous = energy
+        return beat
+
+# Function to pack one frame of bands
+def pack_message(frame: int, seconds: float, bands: np.ndarray, beat: bool) -> bytes:
+    """Returns the binary message for one frame, with the bands quantized to a byte each."""
+    levels = np.clip(np.asarray(bands, dtype=np.float32) * 255, 0, 255).astype(np.uint8)
+    return HEADER.pack(MAGIC, frame & 0xFFFFFFFF, seconds, BEAT_FLAG if beat else 0, len(levels)) + levels.tobytes()
+
+# Function to unpack one message, for subscribers written in Python
+def unpack_message(message: bytes) -> tuple:
+    """Returns (frame, seconds, beat, bands) with the bands back in 0-1."""
+    magic, frame, seconds, flags, count = HEADER.unpack_from(message)
+    if magic != MAGIC:
+        raise ValueError("Not a band message")
+    bands = np.frombuffer(message, dtype=np.uint8, count=count, offset=HEADER.size) / 255
+    return frame, seconds, bool(flags & BEAT_FLAG), bands
+
+# Function to wrap a message in a binary WebSocket frame
+def _websocket_frame(message: bytes) -> bytes:
+    length = len(message)
+    if length < 126:
+        return struct.pack("!BB", 0x82, length) + message
+    if length < 1 << 16:
+        return struct.pack("!BBH", 0x82, 126, length) + message
+    return struct.pack("!BBQ", 0x82, 127, length) + message
+
+# Class for one connected subscriber
+class _Subscriber:
+    """Sends queued messages on its own thread, so a slow socket never blocks the publisher."""
+
+    def __init__(self, connection: socket.socket, websocket: bool) -> None:
+        self.connection = connection
+        self.websocket = websocket
+        self.messages = queue.Queue(maxsize=CLIENT_QUEUE)
+        self.alive = True
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
+        self.thread.start()
+
+    def _send_loop(self) -> None:
+        try:
+            while self.alive:
+                message = self.messages.get()
+                if message is None:
+                    break
+                self.connection.sendall(_websocket_frame(message) if self.websocket else message)
+        except OSError:
+            pass  # Disconnected
+        finally:
+            self.close()
+
+    def offer(self, message: bytes) -> bool:
+        """Queues a message and returns False if the subscriber is gone or too far behind."""
+        if not self.alive:
+            return False
+        try:
+            self.messages.put_nowait(message)
+            return True
+        except queue.Full:
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if not self.alive:
+            return
+        self.alive = False
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)  # Unblocks a sendall stuck on a full socket buffer
+        except OSError:
+            pass
+        self.connection.close()
+        try:
+            self.messages.put_nowait(None)
+        except queue.Full:
+            pass
+
+# Class to fan band data out to any number of local subscribers
+class BandPublisher:
+    """Serves each frame's bands and beat flag to subscribers on a local TCP port.
+
+    Plain TCP subscribers receive the messages back to back (each one carries its
+    own length in the header). With `websocket` set, subscribers connect with a
+    WebSocket handshake instead, e.g. a browser overlay, and get one binary frame
+    per message. A subscriber that falls CLIENT_QUEUE messages behind is
+    disconnected; publish() never waits on a socket.
+    """
+
+    def __init__(self, port: int = PORT, host: str = "127.0.0.1", websocket: bool = False) -> None:
+        self.websocket = websocket
+        self.subscribers = []
+        self.dropped = 0
+        self.frame = 0
+        self.started = None
+        self.beats = BeatDetector()
+        self.lock = threading.Lock()
+        self.server = socket.create_server((host, port))
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self.thread.start()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                break  # Server closed
+            threading.Thread(target=self._add_subscriber, args=(connection,), daemon=True).start()
+
+    def _add_subscriber(self, connection: socket.socket) -> None:
+        """Completes the handshake, if any, and starts sending to the new subscriber."""
+        try:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+            if self.websocket:
+                self._handshake(connection)
+        except (OSError, ValueError):
+            connection.close()
+            return
+        with self.lock:
+            self.subscribers.append(_Subscriber(connection, self.websocket))
+
+    def _handshake(self, connection: socket.socket) -> None:
+        """Answers the HTTP upgrade request of a WebSocket client."""
+        connection.settimeout(5)
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = connection.recv(4096)
+            if not chunk or len(request) > 16384:
+                raise ValueError("Incomplete WebSocket handshake")
+            request += chunk
+        connection.settimeout(None)
+        key = next((line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+                    if line.lower().startswith(b"sec-websocket-key:")), None)
+        if key is None:
+            raise ValueError("Not a WebSocket request")
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        connection.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self.subscribers)
+
+    def publish(self, bands: np.ndarray, beat: bool = None, seconds: float = None) -> None:
+        """Sends one frame of 0-1 band energies at `seconds` into the track, detecting the beat unless it is given."""
+        bands = np.atleast_2d(bands).mean(axis=0)  # Stereo graphs publish the channel average
+        if seconds is None:
+            now = time.perf_counter()
+            self.started = self.started or now
+            seconds = now - self.started
+        if beat is None:
+            beat = self.beats.update(bands, seconds)
+        message = pack_message(self.frame, seconds, bands, beat)
+        self.frame += 1
+        with self.lock:
+            if not self.subscribers:
+                return
+            alive = [subscriber for subscriber in self.subscribers if subscriber.offer(message)]
+            self.dropped += len(self.subscribers) - len(alive)
+            self.subscribers = alive
+
+    def publish_features(self, features: dict, seconds: float = None) -> None:
+        """Publishes the BAND_FEATURE a style's FeatureGraph already computed."""
+        self.publish(features[BAND_FEATURE], seconds=seconds)
+
+    def close(self) -> None:
+        """Stops accepting subscribers and disconnects the current ones."""
+        self.server.close()
+        with self.lock:
+            for subscriber in self.subscribers:
+                subscriber.close()
+            self.subscribers = []
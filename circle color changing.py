@@ -1,16 +1,30 @@
 import numpy as np
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from idle import IdleMonitor
+from band_publisher import BandPublisher, BAND_FEATURE
+from palette import TimedPalette
 import math
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
+PUBLISH_PORT = None  # Set to a port (e.g. 8765) to stream band energies and beats to local subscribers
+PUBLISH_WEBSOCKET = False  # Serve the subscribers over WebSocket, e.g. for browser overlays
 RADIUS = 150  # Radius of the medium circle
 POWER = 2  # Increase power for more responsiveness
 BAND_DIVISION = 4
 
+# This style maps the whole spectrum, published bands come from the same FFT
+FEATURE_GRAPH = FeatureGraph(["spectrum", BAND_FEATURE] if PUBLISH_PORT else ["spectrum"], FRAME_SIZE)
+PUBLISHER = BandPublisher(PUBLISH_PORT, websocket=PUBLISH_WEBSOCKET) if PUBLISH_PORT else None
+IDLE = IdleMonitor(animated=True)  # Moves with the clock, so it only sleeps on the event queue once the stream has ended
+
 # Function to create a dynamic color based on time
 def get_dynamic_circle_color(time: float) -> tuple:
     """Returns a dynamic color for the circle based on time."""
@@ -19,17 +33,18 @@ def get_dynamic_circle_color(time: float) -> tuple:
     b = 255  # Keep blue constant for a cooler tone
     return (r, g, b)
 
-# Function to draw the circular spectrum
-def draw_circular_spectrum(screen: pygame.Surface, samples: np.ndarray, circle_color: tuple) -> None:
-    """Draws the circular spectrum based on the input samples."""
-    fft_data = np.fft.fft(samples)
-    fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
+# The circle color only depends on time and repeats every 2π seconds, so its rows are cached per frame step
+CIRCLE_PALETTE = TimedPalette(lambda value, time: get_dynamic_circle_color(time), size=1, period=2 * math.pi)
 
-    # Normalize using logarithmic scaling
-    fft_magnitude = np.log1p(fft_magnitude)
-    max_magnitude = np.max(fft_magnitude)
-    if max_magnitude > 0:
-        fft_magnitude /= max_magnitude
+# Function to draw the circular spectrum
+def draw_circular_spectrum(screen: pygame.Surface, samples: np.ndarray, circle_color: tuple,
+                           seconds: float = None) -> None:
+    """Draws the circular spectrum based on the input samples, which start `seconds` into the track."""
+    # Normalized magnitudes of the channel average, from one batched FFT
+    features = FEATURE_GRAPH.compute(samples)
+    fft_magnitude = features["spectrum"]
+    if PUBLISHER is not None:
+        PUBLISHER.publish_features(features, seconds)  # Lights and overlays get this frame's bands and track time
 
     # Smooth the magnitude using a moving average
     smooth_magnitude = np.convolve(fft_magnitude, np.ones(5) / 5, mode='valid')
@@ -69,7 +84,7 @@ def draw_circular_spectrum(screen: pygame.Surface, samples: np.ndarray, circle_c
 
     # Draw the dynamic gradient circle
     current_time = pygame.time.get_ticks() / 1000  # Get time in seconds
-    circle_color = get_dynamic_circle_color(current_time)  # Get color based on time
+    circle_color = CIRCLE_PALETTE.color(current_time)  # Get color based on time
     pygame.draw.circle(screen, circle_color, (center_x, center_y), RADIUS, 5)  # Draw circle outline
 
     pygame.display.flip()
@@ -80,11 +95,9 @@ def main() -> None:
     try:
         # Load the audio file
         audio_file = r"C:\Users\audio.mp3" #Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-        audio_data = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-
-        # Normalize audio data
-        audio_data /= np.max(np.abs(audio_data))
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
 
         # Set up Pygame
         pygame.init()
@@ -92,26 +105,39 @@ def main() -> None:
         pygame.display.set_caption("Dynamic Circular Audio Spectrum")
         clock = pygame.time.Clock()
 
-        # Initialize Pygame mixer
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
 
         running = True
         while running:
-            for event in pygame.event.get():
+            for event in IDLE.events():  # Blocks once the stream has ended
                 if event.type == pygame.QUIT:
                     running = False
-
-            # Read a frame of audio data
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-                circle_color = get_dynamic_circle_color(pygame.time.get_ticks() / 1000)  # Update circle color
-                draw_circular_spectrum(screen, frame, circle_color)
-
-            clock.tick(30)  # Limit frame rate
-
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
+
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                frame = store.frame(position)
+                if IDLE.update(frame):  # The color keeps cycling, so every frame is drawn until the stream ends
+                    circle_color = CIRCLE_PALETTE.color(pygame.time.get_ticks() / 1000)  # Update circle color
+                    draw_circular_spectrum(screen, frame, circle_color, store.time_of(position))
+            else:
+                IDLE.update(None)  # Keep the last frame, wait for a seek or the next track
+
+            playlist.update()  # Queue the next track once it is decoded
+            IDLE.tick(clock, 30)  # Limit frame rate while the stream plays
+
+        playlist.close()
+        if PUBLISHER is not None:
+            PUBLISHER.close()
         pygame.quit()
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -1,16 +1,26 @@
 import numpy as np
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from idle import IdleMonitor
+from palette import Palette
+from layers import Scene
 import math
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
 RADIUS = 80  # Radius of the central circle
 LINE_LENGTH = 150  # Length of the radiating lines
 NUM_LINES = 36  # Number of radiating lines
 
+# The lines only read the lowest bins of the spectrum
+FEATURE_GRAPH = FeatureGraph(["low_spectrum"], FRAME_SIZE)
+
 # Function to create vibrant colors
 def get_color(value: float) -> tuple:
     """Returns a color based on the input value."""
@@ -19,6 +29,8 @@ def get_color(value: float) -> tuple:
     b = int(255 * (1 - value))  # Dynamic blue value for vibrance
     return (r, g, b)
 
+COLOR_PALETTE = Palette(get_color)  # get_color baked into a lookup table
+
 # Function to draw the hollow circle
 def draw_hollow_circle(screen: pygame.Surface, center: tuple) -> None:
     """Draws the hollow central circle."""
@@ -27,6 +39,7 @@ def draw_hollow_circle(screen: pygame.Surface, center: tuple) -> None:
 # Function to draw radiating lines
 def draw_radiating_lines(screen: pygame.Surface, center: tuple, magnitudes: np.ndarray) -> None:
     """Draws lines radiating from the circle based on the magnitudes of frequencies."""
+    colors = COLOR_PALETTE.map(magnitudes[np.arange(NUM_LINES) % len(magnitudes)]).tolist()  # All line colors at once
     for i in range(NUM_LINES):
         angle = (i / NUM_LINES) * (2 * math.pi)
         length = LINE_LENGTH * (magnitudes[i % len(magnitudes)])  # Scale line length
@@ -36,7 +49,14 @@ def draw_radiating_lines(screen: pygame.Surface, center: tuple, magnitudes: np.n
         end_y = int(start_y + length * math.sin(angle))
 
         # Draw the line
-        pygame.draw.line(screen, get_color(magnitudes[i % len(magnitudes)]), (start_x, start_y), (end_x, end_y), 3)
+        pygame.draw.line(screen, colors[i], (start_x, start_y), (end_x, end_y), 3)
+
+# The background and the hollow nucleus never change, only the lines are redrawn
+CENTER = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+SCENE = Scene()
+SCENE.add(lambda surface: draw_hollow_circle(surface, CENTER), static=True)
+SCENE.add(lambda surface, magnitudes: draw_radiating_lines(surface, CENTER, magnitudes))
+IDLE = IdleMonitor()  # Skips redrawing repeated frames and sleeps on the event queue once the stream has ended
 
 # Main loop
 def main() -> None:
@@ -44,11 +64,9 @@ def main() -> None:
     try:
         # Load the audio file
         audio_file = r"C:\Users\audio.mp3" #Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-        audio_data = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-
-        # Normalize audio data
-        audio_data /= np.max(np.abs(audio_data))
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
 
         # Set up Pygame
         pygame.init()
@@ -56,41 +74,41 @@ def main() -> None:
         pygame.display.set_caption("Audio Visualizer")
         clock = pygame.time.Clock()
 
-        # Initialize Pygame mixer
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
 
         running = True
         while running:
-            for event in pygame.event.get():
+            for event in IDLE.events():  # Blocks once the stream has ended
                 if event.type == pygame.QUIT:
                     running = False
-
-            # Clear screen
-            screen.fill((0, 0, 0))
-
-            # Read a frame of audio data
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-                
-                # Perform FFT to get frequency magnitudes
-                fft_data = np.fft.fft(frame)
-                fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
-                fft_magnitude = np.log1p(fft_magnitude)  # Logarithmic scaling
-                max_magnitude = np.max(fft_magnitude)
-                if max_magnitude > 0:
-                    fft_magnitude /= max_magnitude  # Normalize
-
-                center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-
-                draw_hollow_circle(screen, center)  # Draw the hollow nucleus
-                draw_radiating_lines(screen, center, fft_magnitude)  # Draw lines
-
-            pygame.display.flip()
-            clock.tick(30)  # Limit frame rate
-
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
+
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                frame = store.frame(position)
+                if IDLE.update(frame):  # The same samples would draw the same picture
+                    # Keep the low bins the lines use, cut from the full spectrum
+                    fft_magnitude = FEATURE_GRAPH.compute(frame)["low_spectrum"]
+
+                    SCENE.render(screen, fft_magnitude)  # Cached background and nucleus, then the lines
+                    pygame.display.flip()
+            elif IDLE.update(None):  # Clear the screen once, then wait for a seek or the next track
+                screen.fill((0, 0, 0))
+                pygame.display.flip()
+
+            playlist.update()  # Queue the next track once it is decoded
+            IDLE.tick(clock, 30)  # Limit frame rate while the stream plays
+
+        playlist.close()
         pygame.quit()
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -1,17 +1,31 @@
 import numpy as np
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from idle import IdleMonitor
+from palette import TimedPalette
+from quality import QualityController
 import math
 import random
+from functools import lru_cache
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
+FPS = 30
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
+CHANNEL_MODE = "mono"  # "mono", "stereo" (left/right) or "mid_side"
 RADIUS = 150  # Radius of the medium circle
 POWER = 2  # Power for better visibility
 NUM_SINE_WAVES = 3  # Number of sine waves
 DANCE_SPEED = 0.1  # Speed for the sine wave movement
+NUM_POINTS = 360  # Points per sine wave at full quality
+
+# This style maps the whole spectrum
+FEATURE_GRAPH = FeatureGraph(["spectrum"], FRAME_SIZE, CHANNEL_MODE)
 
 # Function to create a gradient color for the circle outline
 def get_gradient_color(time: float) -> tuple:
@@ -21,52 +35,71 @@ def get_gradient_color(time: float) -> tuple:
     b = 255  # Keep blue constant
     return (r, g, b)
 
-# Function to draw sine waves around a circle
-def draw_circular_sine_waves(screen: pygame.Surface, samples: np.ndarray, time: float) -> None:
-    """Draws multiple sine waves around a circle based on the input samples."""
-    fft_data = np.fft.fft(samples)
-    fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
+# The gradient only depends on time and repeats every 2*pi seconds, so its rows are cached per frame step
+GRADIENT_PALETTE = TimedPalette(lambda value, time: get_gradient_color(time), size=1, period=2 * math.pi)
+
+# Lowers the point count when frames run over budget, drawing the points costs far more than the pixels
+QUALITY = QualityController((SCREEN_WIDTH, SCREEN_HEIGHT), FPS, resolution=False)
+IDLE = IdleMonitor(animated=True)  # Moves with the clock, so it only sleeps on the event queue once the stream has ended
+
+# Spectrum bin under each point of a wave at full quality
+POINT_BINS = ((np.arange(NUM_POINTS) / NUM_POINTS) * (FRAME_SIZE // 2 - 1)).astype(int)
 
-    # Normalize using logarithmic scaling
-    fft_magnitude = np.log1p(fft_magnitude)
-    max_magnitude = np.max(fft_magnitude)
-    if max_magnitude > 0:
-        fft_magnitude /= max_magnitude
+# Function to derive the wave levels of many frames at once
+def wave_levels(frames: np.ndarray) -> np.ndarray:
+    """Returns (frames, rows, NUM_POINTS) uint8 levels of the spectrum raised to POWER, one row per channel (one in mono).
 
+    Only the bins the points sit on are kept, at 8 bits, so a precomputed hour
+    of mono takes about 56 MB.
+    """
+    # Normalized magnitudes from batched FFTs over all frames and channels
+    spectra = FEATURE_GRAPH.compute(frames)["spectrum"]
+    levels = spectra.reshape(len(frames), -1, spectra.shape[-1])[..., POINT_BINS] ** POWER
+    return np.rint(levels * 255).astype(np.uint8)
+
+PRECOMPUTE = {"levels": wave_levels}  # Derived for the whole track in a few vectorized passes when it loads
+
+# Function to map the points of a wave to the levels kept by wave_levels
+@lru_cache(maxsize=16)
+def point_layout(num_points: int) -> tuple:
+    """Returns the level index and base angle of every point, once per detail level."""
+    points = np.arange(num_points)
+    return (points * NUM_POINTS) // num_points, 2 * np.pi * points / num_points
+
+# Function to draw sine waves around a circle
+def draw_circular_sine_waves(screen: pygame.Surface, levels: np.ndarray, time: float) -> None:
+    """Draws multiple sine waves around a circle from one frame of wave_levels, scaled to the surface."""
     # Clear screen
     screen.fill((0, 0, 0))
 
-    # Set parameters
-    center_x = SCREEN_WIDTH // 2
-    center_y = SCREEN_HEIGHT // 2
-    num_points = 360  # Number of points around the circle
+    # Set parameters, geometry follows the surface so it can be rendered at a reduced scale
+    scale = screen.get_width() / SCREEN_WIDTH
+    center_x = screen.get_width() // 2
+    center_y = screen.get_height() // 2
+    radius = RADIUS * scale
+    point_radius = max(1, round(2 * scale))
+    num_points = QUALITY.detail(NUM_POINTS, NUM_POINTS // 4)  # Number of points around the circle
+    color = GRADIENT_PALETTE.color(time)  # Every point and the outline share this frame's color
+
+    indices, angles = point_layout(num_points)
 
     # Draw sine waves
     for wave_index in range(NUM_SINE_WAVES):
         frequency = random.uniform(0.02, 0.05)  # Random frequency for smoother movement
         offset_angle = wave_index * (360 / NUM_SINE_WAVES) * (math.pi / 180)  # Offset for each wave
+        amplitudes = levels[wave_index % len(levels)][indices] * (radius * 0.5 / 255)  # Waves alternate between channels
 
-        for angle in range(num_points):
-            # Calculate the corresponding FFT index
-            index = int((angle / num_points) * (len(fft_magnitude) - 1))
-            if index < len(fft_magnitude):
-                amplitude = (fft_magnitude[index] ** POWER) * RADIUS * 0.5  # Scale the amplitude
-            else:
-                amplitude = 0
-
-            # Calculate the position on the circle
-            theta = math.radians(angle) + offset_angle + (time * DANCE_SPEED)
-            x = center_x + int((RADIUS + amplitude) * math.cos(theta))
-            y = center_y + int((RADIUS + amplitude) * math.sin(theta))
+        # Calculate the positions on the circle
+        theta = angles + offset_angle + (time * DANCE_SPEED)
+        xs = (center_x + ((radius + amplitudes) * np.cos(theta)).astype(int)).tolist()
+        ys = (center_y + ((radius + amplitudes) * np.sin(theta)).astype(int)).tolist()
 
-            # Draw the point of the sine wave
-            color = get_gradient_color(time)  # Get gradient color for the current wave
-            pygame.draw.circle(screen, color, (x, y), 2)
+        # Draw the points of the sine wave
+        for x, y in zip(xs, ys):
+            pygame.draw.circle(screen, color, (x, y), point_radius)
 
     # Draw the gradient circle outline
-    pygame.draw.circle(screen, get_gradient_color(time), (center_x, center_y), RADIUS, 5)  # Draw circle outline
-
-    pygame.display.flip()
+    pygame.draw.circle(screen, color, (center_x, center_y), int(radius), max(1, round(5 * scale)))  # Draw circle outline
 
 # Main loop
 def main() -> None:
@@ -74,11 +107,9 @@ def main() -> None:
     try:
         # Load the audio file
         audio_file = r"C:\Users\audio.mp3" #Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-        audio_data = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-
-        # Normalize audio data
-        audio_data /= np.max(np.abs(audio_data))
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE, precompute=PRECOMPUTE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
 
         # Set up Pygame
         pygame.init()
@@ -86,28 +117,42 @@ def main() -> None:
         pygame.display.set_caption("Gradient Circular Sine Wave Audio Visualizer")
         clock = pygame.time.Clock()
 
-        # Initialize Pygame mixer
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
 
         running = True
         start_time = pygame.time.get_ticks() / 1000  # Start time in seconds
         while running:
             current_time = pygame.time.get_ticks() / 1000 - start_time  # Elapsed time
 
-            for event in pygame.event.get():
+            for event in IDLE.events():  # Blocks once the stream has ended
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
+
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                levels = store.precompute("levels", wave_levels)[position]  # Derived when the track loaded
+                if IDLE.update(levels):  # The waves keep turning, so every frame is drawn until the stream ends
+                    surface = QUALITY.begin(screen)
+                    draw_circular_sine_waves(surface, levels, current_time)
+                    QUALITY.end(screen, surface)  # Records the frame time
+                    pygame.display.flip()
+            else:
+                IDLE.update(None)  # Keep the last frame, wait for a seek or the next track
 
-            # Read a frame of audio data
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-                draw_circular_sine_waves(screen, frame, current_time)
-
-            clock.tick(30)  # Limit frame rate
+            playlist.update()  # Queue the next track once it is decoded
+            IDLE.tick(clock, FPS)  # Limit frame rate while the stream plays
 
+        playlist.close()
         pygame.quit()
     except Exception as e:
         print(f"An error occurred: {e}")
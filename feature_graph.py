@@ -0,0 +1,93 @@
+import numpy as np
+from audio_analysis import compute_spectra
+
+LOW_FRACTION = 8  # low_spectrum keeps the lowest 1 / LOW_FRACTION of the spectrum's bins
+
+# Class to compute the features the styles asked for, sharing one spectrum per frame
+class FeatureGraph:
+    """Resolves declared features into the computations they depend on.
+
+    Feature names:
+        "waveform"            channel-mixed samples of the frame
+        "spectrum"            the full normalized spectrum (one FFT of frame_size)
+        "low_spectrum"        the lowest frame_size // (2 * LOW_FRACTION) bins of the spectrum
+        "low_band_energy:B"   mean of the lowest B bins of the spectrum
+        "log_bands:N"         mean of N logarithmically spaced bands of the spectrum
+
+    Each node is evaluated at most once per frame, so styles that share a graph
+    (pass all of their features in one list) share the intermediates too, and
+    nodes nobody declared are never evaluated. Every spectral feature is cut
+    from the one full spectrum: each row is normalized to its maximum over all
+    bins, so a smaller FFT would change the picture. The FFT is only skipped
+    for graphs that need nothing but the waveform.
+    """
+
+    def __init__(self, features, frame_size: int = 1024, mode: str = "mono") -> None:
+        self.frame_size = frame_size
+        self.mode = mode
+        self.low_bins = frame_size // (2 * LOW_FRACTION)
+        self.band_edges = {}
+        self.order = []
+        for name in features:
+            self._add(name)
+        self.steps = [(name, self._step(name)) for name in self.order]
+
+    def _dependencies(self, name: str) -> tuple:
+        """Returns the features `name` is computed from."""
+        kind, _, param = name.partition(":")
+        if kind in ("waveform", "spectrum"):
+            return ()
+        if kind in ("low_spectrum", "low_band_energy", "log_bands"):
+            return ("spectrum",)
+        raise ValueError(f"Unknown feature: {name}")
+
+    def _add(self, name: str) -> None:
+        """Adds `name` after its dependencies, keeping the evaluation order topological."""
+        if name in self.order:
+            return
+        for dependency in self._dependencies(name):
+            self._add(dependency)
+        self.order.append(name)
+
+    def _log_band_edges(self, count: int, bins: int) -> np.ndarray:
+        """Returns count + 1 strictly increasing bin edges spaced logarithmically from bin 1."""
+        edges = self.band_edges.get((count, bins))
+        if edges is None:
+            edges = np.round(np.geomspace(1, bins, count + 1)).astype(np.intp)
+            edges = np.maximum(edges, np.arange(1, count + 2))  # At least one bin per band
+            edges = np.minimum(edges, bins - count + np.arange(count + 1))
+            self.band_edges[(count, bins)] = edges
+        return edges
+
+    def _step(self, name: str):
+        """Returns a function computing `name` from the frame and the results so far."""
+        kind, _, param = name.partition(":")
+        mode = self.mode
+        if kind == "waveform":
+            return lambda frame, results: frame.mean(axis=-2) if mode == "mono" else frame
+        if kind == "spectrum":
+            return lambda frame, results: compute_spectra(frame, mode)
+        if kind == "low_spectrum":
+            bins = self.low_bins
+            return lambda frame, results: results["spectrum"][..., :bins]
+        if kind == "low_band_energy":
+            bins = int(param)
+            return lambda frame, results: np.mean(results["spectrum"][..., :bins], axis=-1)
+        if kind == "log_bands":
+            count = int(param)
+
+            def log_bands(frame, results):
+                spectrum = results["spectrum"]
+                edges = self._log_band_edges(count, spectrum.shape[-1])
+                return np.add.reduceat(spectrum[..., :edges[-1]], edges[:-1], axis=-1) / np.diff(edges)
+            return log_bands
+
+    def compute(self, frame: np.ndarray) -> dict:
+        """Returns the declared features (and their intermediates) for one (channels, frame_size) frame.
+
+        A (frames, channels, frame_size) block gives every feature with a leading frames axis.
+        """
+        results = {}
+        for name, step in self.steps:
+            results[name] = step(frame, results)
+        return results
@@ -0,0 +1,61 @@
+from collections import OrderedDict
+import pygame
+
+FRAME_CACHE_MB = 256  # Default memory budget for cached frames
+
+# Class to reuse whole rendered frames when a style's state repeats
+class FrameCache:
+    """Caches complete frames keyed by a style's quantized state with least-recently-used eviction.
+
+    Styles whose frame is fully determined by a few small integers (a radius and a
+    palette index) look the key up before drawing: a hit is one blit of the stored
+    frame, a miss draws as usual and stores a copy. The surface size is part of the
+    key, so previews and full-resolution exports never share frames. Memory is
+    bounded by `max_mb` rather than by a frame count.
+    """
+
+    def __init__(self, max_mb: float = FRAME_CACHE_MB) -> None:
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.frames = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def restore(self, screen: pygame.Surface, state: tuple) -> bool:
+        """Blits the frame stored for `state` onto the screen and returns True, or returns False on a miss."""
+        key = (screen.get_size(), state)
+        frame = self.frames.get(key)
+        if frame is None:
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        self.frames.move_to_end(key)
+        screen.blit(frame, (0, 0))
+        return True
+
+    def store(self, screen: pygame.Surface, state: tuple) -> None:
+        """Keeps a copy of the frame just drawn for `state`, evicting the oldest frames over the budget."""
+        key = (screen.get_size(), state)
+        if key in self.frames:
+            return
+        frame = screen.copy()
+        size = frame.get_pitch() * frame.get_height()
+        if size > self.max_bytes:
+            return  # A single frame doesn't fit, caching it would only churn
+        self.frames[key] = frame
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.frames.popitem(last=False)  # Evict the least recently used frame
+            self.bytes -= evicted.get_pitch() * evicted.get_height()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def summary(self) -> str:
+        """Returns a one-line report of the hit rate and memory use."""
+        return (f"Frame cache: {self.hit_rate:.1%} hit rate over {self.hits + self.misses} frames, "
+                f"{len(self.frames)} frames in {self.bytes / (1024 * 1024):.1f} MB")
@@ -0,0 +1,59 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+# Class to hand frames between processes without pickling or copying them
+class FrameRing:
+    """A fixed pool of frame buffers in shared memory, passed around by slot index.
+
+    The producer acquires a free slot (blocking when all of them are in use, which
+    is the backpressure), fills it in place and publishes it. The consumer takes
+    published slots in order and releases them when it is done.
+    """
+
+    def __init__(self, frame_shape: tuple, slots: int = 8, dtype=np.uint8, context=None) -> None:
+        context = context or multiprocessing.get_context()  # Must match the context the processes are started from
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.slots = slots
+        self.memory = shared_memory.SharedMemory(create=True, size=self.frame_bytes * slots)
+        self.free_slots = context.Queue()
+        self.filled_slots = context.Queue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+
+    def buffer(self, slot: int) -> memoryview:
+        """Returns the raw bytes of one slot."""
+        start = slot * self.frame_bytes
+        return self.memory.buf[start:start + self.frame_bytes]
+
+    def frame(self, slot: int) -> np.ndarray:
+        """Returns one slot as an array view."""
+        return np.ndarray(self.frame_shape, dtype=self.dtype, buffer=self.memory.buf, offset=slot * self.frame_bytes)
+
+    def acquire(self) -> int:
+        """Blocks until a slot is free and returns it."""
+        return self.free_slots.get()
+
+    def publish(self, slot: int) -> None:
+        """Hands a filled slot to the consumer."""
+        self.filled_slots.put(slot)
+
+    def finish(self) -> None:
+        """Tells the consumer no more slots will be published."""
+        self.filled_slots.put(None)
+
+    def take(self):
+        """Blocks until a slot is published and returns it, or None once the producer is done."""
+        return self.filled_slots.get()
+
+    def release(self, slot: int) -> None:
+        """Returns a consumed slot to the pool."""
+        self.free_slots.put(slot)
+
+    def close(self, unlink: bool = False) -> None:
+        """Detaches from the shared memory, removing it when `unlink` is set."""
+        self.memory.close()
+        if unlink:
+            self.memory.unlink()
@@ -1,20 +1,27 @@
-import numpy as np
+from functools import lru_cache
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from idle import IdleMonitor
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
 NUM_ROWS = 20
 NUM_COLS = 40
 
-# Function to load the audio file
-def load_audio_file(file_path):
+# This style maps the whole spectrum
+FEATURE_GRAPH = FeatureGraph(["spectrum"], FRAME_SIZE)
+IDLE = IdleMonitor()  # Skips redrawing repeated frames and sleeps on the event queue once the stream has ended
+
+# Function to load the audio files, the ones after the first are decoded in the background
+def load_playlist(file_paths):
     try:
-        audio_segment = AudioSegment.from_file(file_path)
-        audio_data = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-        return audio_data
+        return Playlist(file_paths, FRAME_SIZE, normalize=False)
     except Exception as e:
         print(f"Error loading audio file: {e}")
         return None
@@ -31,10 +38,14 @@ def init_pygame():
         print(f"Error initializing Pygame: {e}")
         return None, None
 
+# Function to render a character once per color, the grid only ever uses a few
+@lru_cache(maxsize=None)
+def render_char(char, color):
+    return pygame.font.Font(None, 24).render(char, True, color)
+
 # Function to draw a character
 def draw_char(screen, x, y, char, amplitude, color):
-    font = pygame.font.Font(None, 24)
-    text = font.render(char, True, color)
+    text = render_char(char, color)
     text_rect = text.get_rect(center=(x, y))
     screen.blit(text, text_rect)
     if amplitude > 0.5:
@@ -42,14 +53,8 @@ def draw_char(screen, x, y, char, amplitude, color):
 
 # Function to draw the character grid
 def draw_char_grid(screen, samples):
-    fft_data = np.fft.fft(samples)
-    fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
-
-    # Normalize using logarithmic scaling
-    fft_magnitude = np.log1p(fft_magnitude)
-    max_magnitude = np.max(fft_magnitude)
-    if max_magnitude > 0:
-        fft_magnitude /= max_magnitude
+    # Normalized magnitudes of the channel average, from one batched FFT
+    fft_magnitude = FEATURE_GRAPH.compute(samples)["spectrum"]
 
     # Clear screen
     screen.fill((0, 0, 0))
@@ -75,36 +80,49 @@ def draw_char_grid(screen, samples):
 # Main loop
 def main():
     audio_file = r"C:\Users\audio.mp3" #Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-    audio_data = load_audio_file(audio_file)
-    if audio_data is None:
+    playlist = load_playlist([audio_file, *PLAYLIST])
+    if playlist is None:
         return
+    store = playlist.current.store
+    position = store.index_at(START_TIME)
 
     screen, clock = init_pygame()
     if screen is None:
         return
 
-    pygame.mixer.init(frequency=44100, channels=2)
     try:
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        playlist.play(store.time_of(position))  # The mixer was opened at the track's own format
     except Exception as e:
         print(f"Error playing audio: {e}")
         return
 
     running = True
     while running:
-        for event in pygame.event.get():
+        for event in IDLE.events():  # Blocks once the stream has ended
             if event.type == pygame.QUIT:
                 running = False
-
-        # Read a frame of audio data
-        if len(audio_data) >= FRAME_SIZE:
-            frame = audio_data[:FRAME_SIZE]
-            audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-            draw_char_grid(screen, frame)
-
-        clock.tick(30)  # Limit frame rate
-
+            elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                store = playlist.advance().store
+                position = 0
+            elif event.type == pygame.KEYDOWN:
+                new_position = scrub_position(event, store, position)
+                if new_position is not None:  # Jump the renderer and the music together
+                    position = new_position
+                    playlist.seek(store.time_of(position))
+
+        # Read the frame being played, so the visuals follow the audio clock
+        position = store.index_at(playlist.position())
+        if position < store.frame_count:
+            frame = store.frame(position)
+            if IDLE.update(frame):  # The same samples would draw the same picture
+                draw_char_grid(screen, frame)
+        else:
+            IDLE.update(None)  # Keep the last frame, wait for a seek or the next track
+
+        playlist.update()  # Queue the next track once it is decoded
+        IDLE.tick(clock, 30)  # Limit frame rate while the stream plays
+
+    playlist.close()
     pygame.quit()
 
 if __name__ == "__main__":
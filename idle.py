@@ -0,0 +1,56 @@
+import numpy as np
+import pygame
+
+IDLE_TIMEOUT_MS = 250  # Longest wait for an event once the stream has ended, so the next track still gets queued
+
+# Class to stop drawing while nothing on screen would change
+class IdleMonitor:
+    """Tracks whether the next frame would look the same as the one on screen.
+
+    The loop passes update() whatever it draws the frame from (the frame's
+    samples or its precomputed parameters), or None once the stream has ended.
+    A frame drawn from the same state as the last one drawn would be the same
+    picture, so update() returns False and the loop neither draws nor flips;
+    digital silence costs nothing, while any frame that differs is drawn as
+    usual. Styles that also animate over time pass `animated`, which only keeps
+    the idling after the end of the stream. Once the stream has ended, events()
+    blocks in pygame.event.wait instead of polling, and any event (input, a
+    seek, the next track starting) ends the wait at once.
+    """
+
+    def __init__(self, timeout_ms: int = IDLE_TIMEOUT_MS, animated: bool = False) -> None:
+        self.timeout_ms = timeout_ms
+        self.animated = animated
+        self.ended = False
+        self.drawn = None  # State of the frame on screen
+
+    def update(self, state) -> bool:
+        """Records the state the next frame is drawn from, None once the stream has ended, and returns True if it needs drawing."""
+        if state is None:
+            changed = not self.ended
+            self.ended = True
+            self.drawn = None  # Whatever comes after a seek or the next track is drawn
+            return changed
+
+        self.ended = False
+        if self.animated:
+            return True
+        if self.drawn is not None and np.array_equal(state, self.drawn):
+            return False
+        self.drawn = np.array(state)  # A copy, the caller's view may be reused
+        return True
+
+    def events(self) -> list:
+        """Returns the queued events like pygame.event.get, waiting for the first one once the stream has ended."""
+        if self.ended and not pygame.event.peek():
+            event = pygame.event.wait(self.timeout_ms)
+            if event.type != pygame.NOEVENT:
+                return [event, *pygame.event.get()]  # Still in the order they were posted
+        return pygame.event.get()
+
+    def tick(self, clock: pygame.time.Clock, fps: int) -> None:
+        """Limits the frame rate, events() does the waiting once the stream has ended."""
+        if self.ended:
+            clock.tick()  # Restart the clock so the first frame after idling isn't delayed
+        else:
+            clock.tick(fps)
@@ -0,0 +1,117 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_FILTER_UP = 2  # Each row stored as the difference from the row above
+
+# Function to build one PNG chunk
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+# Function to encode an RGB frame as PNG
+def encode_png(pixels: np.ndarray, level: int = 6) -> bytes:
+    """Returns the PNG bytes of a (height, width * 3) uint8 RGB array.
+
+    Filtering is done in NumPy and compression in zlib, both of which release the
+    GIL, so several frames can be encoded on a thread pool at once.
+    """
+    height, row_bytes = pixels.shape
+    rows = np.empty((height, row_bytes + 1), dtype=np.uint8)
+    rows[:, 0] = PNG_FILTER_UP
+    rows[0, 1:] = pixels[0]
+    np.subtract(pixels[1:], pixels[:-1], out=rows[1:, 1:])  # Wraps modulo 256 as PNG expects
+
+    header = struct.pack(">IIBBBBB", row_bytes // 3, height, 8, 2, 0, 0, 0)  # 8-bit RGB
+    return (PNG_SIGNATURE + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(rows, level)) + _png_chunk(b"IEND", b""))
+
+# Class to write numbered lossless frames instead of a video file
+class ImageSequenceWriter:
+    """Writes frames as numbered PNG or headerless raw RGB files, compressed on a thread pool.
+
+    A sidecar index.json records the size, pixel format and timestamp of every frame.
+    Frame i is stamped start_time + i / fps, so the frames written must be 1 / fps
+    apart, as they are from a store with hop_size = sample_rate / fps.
+    """
+
+    def __init__(self, output_dir: str, size: tuple, fps: int = 30, image_format: str = "png",
+                 start_time: float = 0.0, workers: int = None, compression: int = 6) -> None:
+        if image_format not in ("png", "raw"):
+            raise ValueError(f"Unknown image format: {image_format}")
+        self.output_file = output_dir
+        self.size = size
+        self.fps = fps
+        self.image_format = image_format
+        self.start_time = start_time
+        self.compression = compression
+        self.frame_count = 0
+        self.error = None
+
+        os.makedirs(output_dir, exist_ok=True)
+        workers = workers or os.cpu_count() or 4
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.pending = threading.BoundedSemaphore(workers * 2)  # Caps frames held in memory
+
+    def _file_name(self, index: int) -> str:
+        return f"frame_{index:06d}.{self.image_format}"
+
+    def _write(self, index: int, pixels: np.ndarray) -> None:
+        """Encodes and writes one frame on a pool thread."""
+        try:
+            data = encode_png(pixels, self.compression) if self.image_format == "png" else pixels
+            with open(os.path.join(self.output_file, self._file_name(index)), "wb") as frame_out:
+                frame_out.write(data)
+        except Exception as e:
+            self.error = self.error or e
+        finally:
+            self.pending.release()
+
+    def write_frame(self, frame) -> None:
+        """Queues one frame, given as a (height, width, 3) array or raw RGB bytes."""
+        if self.error is not None:
+            raise self.error
+        width, height = self.size
+        # Copy out of the caller's buffer, which may be reused as soon as this returns
+        pixels = np.frombuffer(frame, dtype=np.uint8).reshape((height, width * 3)).copy()
+        self.pending.acquire()
+        self.pool.submit(self._write, self.frame_count, pixels)
+        self.frame_count += 1
+
+    def close(self) -> None:
+        """Waits for the queued frames and writes the index."""
+        self.pool.shutdown(wait=True)
+        if self.error is not None:
+            raise self.error
+
+        width, height = self.size
+        index = {
+            "fps": self.fps,
+            "width": width,
+            "height": height,
+            "pixel_format": "rgb24",
+            "format": self.image_format,
+            "frames": [
+                {"frame": i, "file": self._file_name(i), "time": round(self.start_time + i / self.fps, 6)}
+                for i in range(self.frame_count)
+            ],
+        }
+        with open(os.path.join(self.output_file, "index.json"), "w") as index_out:
+            json.dump(index, index_out, indent=1)
+
+    def cancel(self) -> None:
+        """Drops the frames that haven't been written yet."""
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ImageSequenceWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.cancel()
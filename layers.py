@@ -0,0 +1,68 @@
+import pygame
+
+# Class to draw a frame as a stack of static and dynamic layers
+class Scene:
+    """Composites layers in order, rasterizing runs of static layers only once.
+
+    Static layers are called as draw(surface) and cached per surface size; dynamic
+    layers are called as draw(surface, *args) on every frame. The static layers at
+    the bottom are baked together with the background into one opaque surface, so a
+    frame starts with a single blit instead of a fill plus every static draw.
+    """
+
+    def __init__(self, background: tuple = (0, 0, 0)) -> None:
+        self.background = background
+        self.layers = []
+        self.runs = []
+        self.cache = {}
+
+    def add(self, draw_function, static: bool = False) -> None:
+        """Adds a layer above the existing ones."""
+        self.layers.append((draw_function, static))
+        self.runs = self._runs()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drops the cached static layers, e.g. after changing what they draw."""
+        self.cache.clear()
+
+    def _runs(self) -> list:
+        """Groups consecutive layers into (static, [draw functions]) runs."""
+        runs = []
+        for draw_function, static in self.layers:
+            if runs and runs[-1][0] == static:
+                runs[-1][1].append(draw_function)
+            else:
+                runs.append((static, [draw_function]))
+        return runs
+
+    def _bake(self, size: tuple, functions: list, opaque: bool) -> pygame.Surface:
+        """Rasterizes a run of static layers once."""
+        if opaque:
+            surface = pygame.Surface(size)
+            surface.fill(self.background)
+        else:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+        for draw_function in functions:
+            draw_function(surface)
+        return surface
+
+    def render(self, screen: pygame.Surface, *args) -> None:
+        """Draws the whole scene onto screen, redrawing only the dynamic layers."""
+        size = screen.get_size()
+        baked = self.cache.get(size)
+        if baked is None:
+            baked = [
+                self._bake(size, functions, opaque=(index == 0)) if static else None
+                for index, (static, functions) in enumerate(self.runs)
+            ]
+            self.cache[size] = baked
+
+        if not self.runs or not self.runs[0][0]:
+            screen.fill(self.background)  # Nothing static underneath, a fill is cheapest
+        for (static, functions), surface in zip(self.runs, baked):
+            if static:
+                screen.blit(surface, (0, 0))
+            else:
+                for draw_function in functions:
+                    draw_function(screen, *args)
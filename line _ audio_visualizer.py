@@ -1,15 +1,30 @@
 import numpy as np
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from idle import IdleMonitor
+from band_publisher import BandPublisher, BAND_FEATURE
+from palette import index_table
+from functools import lru_cache
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
+PUBLISH_PORT = None  # Set to a port (e.g. 8765) to stream band energies and beats to local subscribers
+PUBLISH_WEBSOCKET = False  # Serve the subscribers over WebSocket, e.g. for browser overlays
 MAX_HEIGHT = 300  # Reduced for better visual balance
 POWER = 0.5
 BAND_DIVISION = 4
 
+# This style maps the whole spectrum, published bands come from the same FFT
+FEATURE_GRAPH = FeatureGraph(["spectrum", BAND_FEATURE] if PUBLISH_PORT else ["spectrum"], FRAME_SIZE)
+PUBLISHER = BandPublisher(PUBLISH_PORT, websocket=PUBLISH_WEBSOCKET) if PUBLISH_PORT else None
+IDLE = IdleMonitor()  # Skips redrawing repeated frames and sleeps on the event queue once the stream has ended
+
 # Function to create a color gradient
 def get_color_gradient(value: float, index: int, total: int) -> tuple:
     """Returns a color gradient based on the input value."""
@@ -18,17 +33,20 @@ def get_color_gradient(value: float, index: int, total: int) -> tuple:
     color.hsva = (hue, 100, 100)  # Convert HSV to RGB
     return (color.r, color.g, color.b)
 
-# Function to draw the line spectrum
-def draw_line_spectrum(screen: pygame.Surface, samples: np.ndarray) -> None:
-    """Draws the line spectrum based on the input samples."""
-    fft_data = np.fft.fft(samples)
-    fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
+# Function to get the colors of all bands at once
+@lru_cache(maxsize=8)
+def get_band_colors(total: int) -> list:
+    """Returns the gradient color of every band, computed once per band count."""
+    return index_table(lambda index, total: get_color_gradient(0.0, index, total), total).tolist()
 
-    # Normalize using logarithmic scaling
-    fft_magnitude = np.log1p(fft_magnitude)
-    max_magnitude = np.max(fft_magnitude)
-    if max_magnitude > 0:
-        fft_magnitude /= max_magnitude
+# Function to draw the line spectrum
+def draw_line_spectrum(screen: pygame.Surface, samples: np.ndarray, seconds: float = None) -> None:
+    """Draws the line spectrum based on the input samples, which start `seconds` into the track."""
+    # Normalized magnitudes of the channel average, from one batched FFT
+    features = FEATURE_GRAPH.compute(samples)
+    fft_magnitude = features["spectrum"]
+    if PUBLISHER is not None:
+        PUBLISHER.publish_features(features, seconds)  # Lights and overlays get this frame's bands and track time
 
     # Smooth the magnitude using a moving average
     smooth_magnitude = np.convolve(fft_magnitude, np.ones(5)/5, mode='valid')
@@ -44,6 +62,7 @@ def draw_line_spectrum(screen: pygame.Surface, samples: np.ndarray) -> None:
     num_bands = len(smooth_magnitude) // BAND_DIVISION
     band_width = SCREEN_WIDTH // num_bands
     base_height = SCREEN_HEIGHT - 50  # Set spectrum above the bottom
+    band_colors = get_band_colors(num_bands)
 
     for i in range(num_bands):
         height = int((smooth_magnitude[i * BAND_DIVISION] ** POWER) * MAX_HEIGHT)
@@ -52,8 +71,7 @@ def draw_line_spectrum(screen: pygame.Surface, samples: np.ndarray) -> None:
         x = i * band_width
         y = base_height - height
 
-        color = get_color_gradient(smooth_magnitude[i * BAND_DIVISION], i, num_bands)
-        pygame.draw.rect(screen, color, (x, y, band_width - 2, height))
+        pygame.draw.rect(screen, band_colors[i], (x, y, band_width - 2, height))
 
     pygame.display.flip()
 
@@ -63,11 +81,9 @@ def main() -> None:
     try:
         # Load the audio file
         audio_file = r"C:\Users\audio.mp3" # Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-        audio_data = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-
-        # Normalize audio data
-        audio_data /= np.max(np.abs(audio_data))
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
 
         # Set up Pygame
         pygame.init()
@@ -75,25 +91,39 @@ def main() -> None:
         pygame.display.set_caption("Audio Spectrum")
         clock = pygame.time.Clock()
 
-        # Initialize Pygame mixer
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
 
         running = True
         while running:
-            for event in pygame.event.get():
+            for event in IDLE.events():  # Blocks once the stream has ended
                 if event.type == pygame.QUIT:
                     running = False
-
-            # Read a frame of audio data
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-                draw_line_spectrum(screen, frame)
-
-            clock.tick(30)  # Limit frame rate
-
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
+
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                frame = store.frame(position)
+                # The same samples would draw the same picture, subscribers still get every frame
+                if IDLE.update(frame) or PUBLISHER is not None:
+                    draw_line_spectrum(screen, frame, store.time_of(position))
+            else:
+                IDLE.update(None)  # Keep the last frame, wait for a seek or the next track
+
+            playlist.update()  # Queue the next track once it is decoded
+            IDLE.tick(clock, 30)  # Limit frame rate while the stream plays
+
+        playlist.close()
+        if PUBLISHER is not None:
+            PUBLISHER.close()
         pygame.quit()
     except Exception as e:
         print(f"An error occurred: {e}")
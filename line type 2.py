@@ -1,14 +1,24 @@
 import numpy as np
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from idle import IdleMonitor
+from palette import Palette
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
 BAR_COUNT = 40  # Number of bars
 MAX_BAR_HEIGHT = 300  # Maximum height of the bars
 
+# The bars only read the lowest bins of the spectrum
+FEATURE_GRAPH = FeatureGraph(["low_spectrum"], FRAME_SIZE)
+IDLE = IdleMonitor()  # Skips redrawing repeated frames and sleeps on the event queue once the stream has ended
+
 # Function to create vibrant colors
 def get_color(value: float) -> tuple:
     """Returns a color based on the input value."""
@@ -17,17 +27,20 @@ def get_color(value: float) -> tuple:
     b = int(255 * (1 - value))  # Dynamic blue value for vibrance
     return (r, g, b)
 
+COLOR_PALETTE = Palette(get_color)  # get_color baked into a lookup table
+
 # Function to draw the spectrum bars
 def draw_bars(screen: pygame.Surface, magnitudes: np.ndarray) -> None:
     """Draws bars based on the magnitudes of frequencies."""
     bar_width = SCREEN_WIDTH // BAR_COUNT  # Calculate width of each bar
+    colors = COLOR_PALETTE.map(magnitudes[np.arange(BAR_COUNT) % len(magnitudes)]).tolist()  # All bar colors at once
     for i in range(BAR_COUNT):
         bar_height = int(magnitudes[i % len(magnitudes)] * MAX_BAR_HEIGHT)
         bar_x = i * bar_width
         bar_y = SCREEN_HEIGHT - bar_height  # Position bars at the bottom
 
         # Draw the bar
-        pygame.draw.rect(screen, get_color(magnitudes[i % len(magnitudes)]), (bar_x, bar_y, bar_width - 2, bar_height))
+        pygame.draw.rect(screen, colors[i], (bar_x, bar_y, bar_width - 2, bar_height))
 
 # Main loop
 def main() -> None:
@@ -35,11 +48,9 @@ def main() -> None:
     try:
         # Load the audio file
         audio_file = r"C:\Users\audio.mp3" # Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-        audio_data = np.array(audio_segment.get_array_of_samples()).astype(np.float32)
-
-        # Normalize audio data
-        audio_data /= np.max(np.abs(audio_data))
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
 
         # Set up Pygame
         pygame.init()
@@ -47,38 +58,42 @@ def main() -> None:
         pygame.display.set_caption("Line Spectrum Visualizer")
         clock = pygame.time.Clock()
 
-        # Initialize Pygame mixer
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
 
         running = True
         while running:
-            for event in pygame.event.get():
+            for event in IDLE.events():  # Blocks once the stream has ended
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
 
-            # Clear screen
-            screen.fill((0, 0, 0))
-
-            # Read a frame of audio data
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-                
-                # Perform FFT to get frequency magnitudes
-                fft_data = np.fft.fft(frame)
-                fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
-                fft_magnitude = np.log1p(fft_magnitude)  # Logarithmic scaling
-                max_magnitude = np.max(fft_magnitude)
-                if max_magnitude > 0:
-                    fft_magnitude /= max_magnitude  # Normalize
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                frame = store.frame(position)
+                if IDLE.update(frame):  # The same samples would draw the same picture
+                    # Keep the low bins the bars use, cut from the full spectrum
+                    fft_magnitude = FEATURE_GRAPH.compute(frame)["low_spectrum"]
 
-                draw_bars(screen, fft_magnitude)  # Draw bars
+                    screen.fill((0, 0, 0))  # Clear screen
+                    draw_bars(screen, fft_magnitude)  # Draw bars
+                    pygame.display.flip()
+            elif IDLE.update(None):  # Clear the screen once, then wait for a seek or the next track
+                screen.fill((0, 0, 0))
+                pygame.display.flip()
 
-            pygame.display.flip()
-            clock.tick(30)  # Limit frame rate
+            playlist.update()  # Queue the next track once it is decoded
+            IDLE.tick(clock, 30)  # Limit frame rate while the stream plays
 
+        playlist.close()
         pygame.quit()
     except Exception as e:
         print(f"An error occurred: {e}")
@@ -0,0 +1,221 @@
+import _thread
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+SAMPLE_SECONDS = 0.25  # How often RSS is sampled while stages run, catches peaks inside a stage
+
+# Function to read the resident set size of one process from /proc
+def _proc_rss(pid="self") -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+# Function to find the processes started from a process, through /proc
+def _proc_descendants(pid: int) -> list:
+    parents = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []  # No /proc, e.g. Windows without psutil
+    for entry in entries:
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as stat:
+                    parents[int(entry)] = int(stat.read().rsplit(")", 1)[1].split()[1])  # Field after the state
+            except (OSError, ValueError, IndexError):
+                pass  # Exited meanwhile
+    descendants, frontier = [], {pid}
+    while frontier:
+        frontier = {child for child, parent in parents.items() if parent in frontier}
+        descendants += frontier
+    return descendants
+
+# Function to read the resident set size of this process
+def current_rss() -> int:
+    """Returns the current RSS in bytes, or 0 when it can't be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return _proc_rss()
+
+# Function to read the resident set size of the processes started from this one
+def children_rss() -> int:
+    """Returns the summed RSS in bytes of every child process (export workers, ffmpeg), or 0 when it can't be read."""
+    if psutil is None:
+        return sum(_proc_rss(pid) for pid in _proc_descendants(os.getpid()))
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass  # Exited meanwhile
+    return total
+
+# Function to read the highest RSS this process has reached
+def peak_rss() -> int:
+    """Returns the peak RSS in bytes, or the current RSS when no peak is available."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # Linux reports kilobytes
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, "peak_wset", memory_info.rss)
+    return current_rss()
+
+# Exception raised when the configured budget is exceeded
+class MemoryBudgetExceeded(MemoryError):
+    """Raised when RSS goes over the memory budget."""
+
+# Class to record memory use per pipeline stage
+class MemoryProfiler:
+    """Records peak RSS and Python allocation deltas for each named stage.
+
+    Allocations are traced in this process only. RSS covers this process and
+    every process started from it, such as the background export's render and
+    encode workers and ffmpeg: a sampling thread adds them up every
+    SAMPLE_SECONDS and charges the total to the stages running at the time,
+    so peaks inside a long stage and in the workers count against the budget.
+    Shared pages, like the frame ring, count once per process, so the total errs high.
+    An overrun seen by the sampler stops the running stage at once: the sampler
+    calls the callbacks given to on_exceeded (e.g. to stop worker processes the
+    stage is waiting on) and interrupts the main thread, and the stage raises
+    MemoryBudgetExceeded in place of the KeyboardInterrupt.
+    When disabled every stage is a no-op, so the calls can stay in the frame loop.
+    """
+
+    def __init__(self, enabled: bool = False, budget_mb: float = None,
+                 report_file: str = "memory_report.json") -> None:
+        self.enabled = enabled
+        self.budget = budget_mb * MB if budget_mb else None
+        self.report_file = report_file
+        self.stages = {}
+        self.started = time.time()
+        self.active = []  # Names of the stages running now, innermost last
+        self.children_rss = 0  # Latest sample of the child processes
+        self.peak_total_rss = 0
+        self.exceeded = None  # (stage, total RSS) of an overrun seen by the sampler
+        self.callbacks = []
+        self.lock = threading.Lock()  # Keeps the sampler from interrupting between stages
+        self.sampler = None
+
+    def on_exceeded(self, callback) -> None:
+        """Registers a callback the sampler thread calls once when the budget is exceeded."""
+        self.callbacks.append(callback)
+
+    def _start(self) -> None:
+        """Starts tracing and sampling on the first stage, so processes that only import the profiler don't."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+        self.sampler.start()
+
+    def _sample(self) -> None:
+        """Samples the RSS of this process and its children for as long as the program runs."""
+        while True:
+            self.children_rss = children_rss()
+            total = current_rss() + self.children_rss
+            self.peak_total_rss = max(self.peak_total_rss, total)
+            for name in list(self.active):
+                stats = self.stages.get(name)
+                if stats is not None:
+                    stats["max_total_rss_bytes"] = max(stats["max_total_rss_bytes"], total)
+            with self.lock:
+                if self.budget is not None and total > self.budget and self.exceeded is None and self.active:
+                    self.exceeded = (self.active[-1], total)
+                    for callback in self.callbacks:
+                        try:
+                            callback()
+                        except Exception:
+                            pass  # The interrupt below still stops the stage
+                    _thread.interrupt_main()  # Raised as MemoryBudgetExceeded by the running stage
+            time.sleep(SAMPLE_SECONDS)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measures the block as one call of the stage `name`."""
+        if not self.enabled:
+            yield
+            return
+        if self.sampler is None:
+            self._start()
+
+        stats = self.stages.setdefault(name, {
+            "calls": 0, "seconds": 0.0, "allocated_bytes": 0, "max_allocated_bytes": 0,
+            "max_transient_bytes": 0, "max_rss_bytes": 0, "max_total_rss_bytes": 0,
+        })
+        with self.lock:
+            self.active.append(name)
+        traced_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        except KeyboardInterrupt:
+            if self.exceeded is None:
+                raise  # A real Ctrl+C
+        finally:
+            with self.lock:
+                self.active.remove(name)
+            elapsed = time.perf_counter() - start
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            rss = current_rss()
+            total = rss + self.children_rss  # Children from the latest sample, reading them every frame costs too much
+
+            stats["calls"] += 1
+            stats["seconds"] += elapsed
+            stats["allocated_bytes"] += traced_after - traced_before
+            stats["max_allocated_bytes"] = max(stats["max_allocated_bytes"], traced_after - traced_before)
+            stats["max_transient_bytes"] = max(stats["max_transient_bytes"], traced_peak - traced_before)
+            stats["max_rss_bytes"] = max(stats["max_rss_bytes"], rss)
+            stats["max_total_rss_bytes"] = max(stats["max_total_rss_bytes"], total)
+
+        self.check_budget(name, total)
+
+    def check_budget(self, name: str, rss: int = None) -> None:
+        """Raises MemoryBudgetExceeded if the RSS of this process and its children is, or was while sampled, over the budget."""
+        if self.budget is None:
+            return
+        if self.exceeded is not None:
+            name, rss = self.exceeded
+        elif rss is None:
+            rss = current_rss() + children_rss()
+        if rss > self.budget:
+            self.write_report()
+            raise MemoryBudgetExceeded(
+                f"Memory budget exceeded during '{name}': using {rss / MB:.0f} MB of "
+                f"{self.budget / MB:.0f} MB including child processes. "
+                f"See {self.report_file} for the per-stage breakdown."
+            )
+
+    def write_report(self) -> None:
+        """Writes the per-stage statistics for this run as JSON."""
+        if not self.enabled:
+            return
+        report = {
+            "duration_seconds": time.time() - self.started,
+            "peak_rss_bytes": peak_rss(),  # This process only
+            "peak_total_rss_bytes": self.peak_total_rss,  # With its child processes, as sampled
+            "budget_bytes": self.budget,
+            "stages": self.stages,
+        }
+        with open(self.report_file, "w") as report_out:
+            json.dump(report, report_out, indent=2)
+        print(f"Memory report saved as {self.report_file} (peak RSS {report['peak_rss_bytes'] / MB:.0f} MB, "
+              f"{report['peak_total_rss_bytes'] / MB:.0f} MB with child processes).")
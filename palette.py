@@ -0,0 +1,79 @@
+from collections import OrderedDict
+import numpy as np
+
+LUT_SIZE = 256  # Entries per baked color table
+
+# Function to bake a color function into a lookup table
+def bake_table(color_function, size: int = LUT_SIZE, *args) -> np.ndarray:
+    """Returns a (size, 3) uint8 table of color_function evaluated over [0, 1]."""
+    values = np.linspace(0.0, 1.0, size) if size > 1 else np.zeros(1)
+    return np.array([color_function(float(value), *args)[:3] for value in values], dtype=np.uint8)
+
+# Class to map magnitudes to colors without per-element Python math
+class Palette:
+    """Maps whole magnitude arrays in [0, 1] to RGB with one indexing operation."""
+
+    def __init__(self, color_function, size: int = LUT_SIZE) -> None:
+        self.size = size
+        self.table = bake_table(color_function, size)
+
+    def indices(self, values) -> np.ndarray:
+        """Converts values in [0, 1] to table indices."""
+        return np.rint(np.clip(values, 0.0, 1.0) * (self.size - 1)).astype(np.intp)
+
+    def map(self, values) -> np.ndarray:
+        """Returns a (..., 3) uint8 array of colors for the values."""
+        return self.table[self.indices(values)]
+
+    def color(self, value: float) -> tuple:
+        """Returns the color of a single value as a tuple pygame accepts."""
+        return tuple(self.table[self.indices(value)].tolist())
+
+    def color_at(self, index: int) -> tuple:
+        """Returns the color of a table index from indices() as a tuple pygame accepts."""
+        return tuple(self.table[index].tolist())
+
+# Function to build a table indexed by position instead of magnitude
+def index_table(color_function, total: int) -> np.ndarray:
+    """Returns a (total, 3) uint8 table of color_function(index, total)."""
+    return np.array([color_function(index, total)[:3] for index in range(total)], dtype=np.uint8)
+
+# Class for palettes that also change over time
+class TimedPalette:
+    """Bakes color_function(value, time) into one row per time step and caches the rows.
+
+    With a period set, times are wrapped so a periodic palette stops missing after one cycle.
+    """
+
+    def __init__(self, color_function, size: int = LUT_SIZE, time_step: float = 1 / 30,
+                 period: float = None, max_rows: int = 512) -> None:
+        self.color_function = color_function
+        self.size = size
+        self.time_step = time_step
+        self.period = period
+        self.max_rows = max_rows
+        self.rows = OrderedDict()
+
+    def row(self, time: float) -> np.ndarray:
+        """Returns the (size, 3) table for the time step containing `time`."""
+        if self.period:
+            time %= self.period
+        key = int(round(time / self.time_step))
+        table = self.rows.get(key)
+        if table is None:
+            table = bake_table(self.color_function, self.size, key * self.time_step)
+            self.rows[key] = table
+            if len(self.rows) > self.max_rows:
+                self.rows.popitem(last=False)
+        else:
+            self.rows.move_to_end(key)
+        return table
+
+    def map(self, values, time: float) -> np.ndarray:
+        """Returns a (..., 3) uint8 array of colors for the values at `time`."""
+        indices = np.rint(np.clip(values, 0.0, 1.0) * (self.size - 1)).astype(np.intp)
+        return self.row(time)[indices]
+
+    def color(self, time: float, value: float = 0.0) -> tuple:
+        """Returns a single color at `time` as a tuple pygame accepts."""
+        return tuple(self.map(value, time).tolist())
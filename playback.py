@@ -0,0 +1,99 @@
+import time
+import pygame
+
+MUSIC_END = pygame.USEREVENT + 1  # Posted when a track ends, including when the queued one takes over
+MIXER_BUFFER = 512  # Samples per mixer buffer (pygame's default), sound is heard about one buffer after it is mixed
+SWITCH_TOLERANCE = 0.05  # Seconds MUSIC_END may be handled after the predicted track switch and still count as on time
+
+# Function to get a decoded segment's samples in the mixer's format
+def pcm_from_segment(audio_segment, sample_rate: int, channels: int) -> bytes:
+    """Returns the samples as interleaved 16-bit PCM at `sample_rate` with `channels` channels."""
+    if audio_segment.frame_rate != sample_rate:
+        audio_segment = audio_segment.set_frame_rate(sample_rate)
+    if audio_segment.channels != channels:
+        audio_segment = audio_segment.set_channels(channels)
+    if audio_segment.sample_width != 2:
+        audio_segment = audio_segment.set_sample_width(2)
+    return audio_segment.raw_data
+
+# Class to play already decoded samples
+class PcmPlayer:
+    """Plays decoded PCM on one mixer channel, so a file is only ever decoded once.
+
+    The mixer is opened at the track's own sample rate and channel count. One
+    more track can be queued behind the playing one; the channel switches to it
+    without a gap and posts MUSIC_END.
+
+    SDL doesn't report how far a channel has played, so position() runs a
+    clock anchored where the mixer's progress is known: play() and seek(), and
+    each track switch (advance(), on MUSIC_END), minus one buffer of output
+    latency. Once the channel stops, the track has ended whatever the clock
+    says. Between anchors the clock only drifts from the audio by mixer
+    underruns, which are re-absorbed at the next switch, seek or end.
+    """
+
+    def __init__(self, sample_rate: int, channels: int) -> None:
+        if pygame.mixer.get_init() != (sample_rate, -16, channels):
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=sample_rate, size=-16, channels=channels, buffer=MIXER_BUFFER)
+        self.sample_rate, _, self.channels = pygame.mixer.get_init()  # What the device actually opened
+        self.latency = MIXER_BUFFER / self.sample_rate
+        self.frame_bytes = 2 * self.channels
+        self.channel = pygame.mixer.Channel(0)
+        self.channel.set_endevent(MUSIC_END)
+        self.pcm = None
+        self.queued = None
+        self.offset = 0.0
+        self.started = time.perf_counter()
+
+    def _sound(self, pcm: bytes, start: float = 0.0) -> pygame.mixer.Sound:
+        """Returns a Sound of `pcm` from `start` seconds on."""
+        frame_count = len(pcm) // self.frame_bytes
+        first = min(max(int(start * self.sample_rate), 0), max(frame_count - 1, 0))
+        return pygame.mixer.Sound(buffer=memoryview(pcm)[first * self.frame_bytes:])
+
+    def play(self, pcm: bytes, start: float = 0.0) -> None:
+        """Plays `pcm` from `start` seconds, keeping the queued track behind it."""
+        self.pcm = pcm
+        self.channel.set_endevent()  # Replacing the playing sound would post MUSIC_END
+        self.channel.play(self._sound(pcm, start))
+        self.channel.set_endevent(MUSIC_END)
+        self.offset = start
+        self.started = time.perf_counter()
+        if self.queued is not None:
+            self.channel.queue(self._sound(self.queued))  # play() drops the queue
+
+    def seek(self, seconds: float) -> None:
+        """Jumps to `seconds` into the playing track."""
+        if self.pcm is not None:
+            self.play(self.pcm, seconds)
+
+    def queue(self, pcm: bytes) -> None:
+        """Queues `pcm` to start the moment the playing track ends."""
+        self.queued = pcm
+        self.channel.queue(self._sound(pcm))
+
+    def advance(self) -> None:
+        """Makes the queued track the playing one, call it on MUSIC_END while the channel is busy."""
+        now = time.perf_counter()
+        switched = self.started + self._duration() - self.offset  # When the clock expected the switch
+        self.pcm, self.queued = self.queued, None
+        self.offset = 0.0
+
+        # MUSIC_END is only seen once the loop polls events, shortly after the switch. Much later or
+        # earlier than expected means the mixer fell behind the clock, so the event is the better anchor
+        self.started = switched if 0 <= now - switched <= SWITCH_TOLERANCE else now
+
+    def _duration(self) -> float:
+        """Returns the length of the playing track in seconds."""
+        return len(self.pcm) / (self.frame_bytes * self.sample_rate) if self.pcm is not None else 0.0
+
+    def position(self) -> float:
+        """Returns the playback position in seconds within the playing track."""
+        if self.pcm is None:
+            return 0.0
+        duration = self._duration()
+        if not self.channel.get_busy():
+            return duration  # The mixer has played all of it
+        elapsed = max(time.perf_counter() - self.started - self.latency, 0.0)
+        return min(self.offset + elapsed, duration)
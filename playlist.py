@@ -0,0 +1,113 @@
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pydub import AudioSegment
+from audio_analysis import load_channels, AnalysisStore
+from playback import MUSIC_END, PcmPlayer, pcm_from_segment
+
+PREFETCH = 1  # Tracks decoded ahead of the one playing
+
+Track = namedtuple("Track", ["audio_file", "sample_rate", "channels", "store", "pcm"])
+
+# Function to decode and index one track
+def load_track(audio_file: str, frame_size: int = 1024, normalize: bool = True, output_format: tuple = None,
+               precompute: dict = None) -> Track:
+    """Returns the decoded track: its analysis samples and its PCM for the mixer, from one decode.
+
+    `output_format` is the mixer's (sample_rate, channels); the PCM is converted to
+    it when the file differs, the analysis always uses the file's own rate.
+    `precompute` maps names to per-frame parameter functions, see AnalysisStore.precompute.
+    """
+    return track_from_segment(audio_file, AudioSegment.from_file(audio_file), frame_size, normalize, output_format,
+                              precompute)
+
+# Function to index a track that has already been decoded
+def track_from_segment(audio_file: str, audio_segment, frame_size: int = 1024, normalize: bool = True,
+                       output_format: tuple = None, precompute: dict = None) -> Track:
+    """Returns the Track of a decoded AudioSegment, see load_track."""
+    audio_data = load_channels(audio_segment, normalize)
+    store = AnalysisStore(audio_data, audio_segment.frame_rate, frame_size)
+    for name, function in (precompute or {}).items():
+        store.precompute(name, function)
+    sample_rate, channels = output_format or (audio_segment.frame_rate, audio_segment.channels)
+    pcm = pcm_from_segment(audio_segment, sample_rate, channels)
+    return Track(audio_file, audio_segment.frame_rate, audio_segment.channels, store, pcm)
+
+# Class to play several tracks back to back in one window
+class Playlist:
+    """Plays tracks without a gap, decoding the next ones on a background thread.
+
+    The mixer is opened at the first track's format and the following tracks
+    are converted to it while they are decoded. The next track is queued on the
+    mixer as soon as it is ready, the mixer switches to it the moment the current
+    one ends and posts MUSIC_END, which is when the visuals move on. At most
+    `prefetch` tracks are decoded ahead, so memory holds the current track plus
+    that many. Parameter tracks listed in `precompute` are derived on the same
+    thread, so a track is ready to draw by the time it starts.
+    """
+
+    def __init__(self, audio_files, frame_size: int = 1024, prefetch: int = PREFETCH, normalize: bool = True,
+                 precompute: dict = None) -> None:
+        self.audio_files = list(audio_files)
+        self.frame_size = frame_size
+        self.prefetch = max(prefetch, 1)
+        self.normalize = normalize
+        self.precompute = precompute
+
+        # Open the mixer at the first track's format, then convert its PCM to whatever the device took
+        audio_segment = AudioSegment.from_file(self.audio_files[0])
+        self.player = PcmPlayer(audio_segment.frame_rate, audio_segment.channels)
+        self.output_format = (self.player.sample_rate, self.player.channels)
+        self.current = track_from_segment(self.audio_files[0], audio_segment, frame_size, normalize,
+                                          self.output_format, precompute)
+
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.pending = deque()  # Futures of the decoded tracks after the current one
+        self.next_index = 1
+        self.queued = False
+        self._fill()
+
+    def _fill(self) -> None:
+        """Starts decoding tracks until `prefetch` of them are ahead."""
+        while len(self.pending) < self.prefetch and self.next_index < len(self.audio_files):
+            audio_file = self.audio_files[self.next_index]
+            self.pending.append(self.pool.submit(load_track, audio_file, self.frame_size, self.normalize,
+                                                 self.output_format, self.precompute))
+            self.next_index += 1
+
+    def has_next(self) -> bool:
+        """Returns True while there is a track after the current one."""
+        return bool(self.pending)
+
+    def play(self, start: float = 0.0) -> None:
+        """Starts the current track at `start` seconds."""
+        self.player.play(self.current.pcm, start)
+        self.update()
+
+    def seek(self, seconds: float) -> None:
+        """Jumps to `seconds` into the current track."""
+        self.player.seek(seconds)
+
+    def position(self) -> float:
+        """Returns the playback position in seconds within the current track."""
+        return self.player.position()
+
+    def update(self) -> None:
+        """Queues the next track on the mixer once it has been decoded, call it every frame."""
+        if not self.queued and self.pending and self.pending[0].done():
+            self.player.queue(self.pending[0].result().pcm)
+            self.queued = True
+
+    def advance(self) -> Track:
+        """Moves to the next track once the current one has ended, and returns it."""
+        self.current = self.pending.popleft().result()  # Only waits if decoding is slower than a whole track
+        if self.queued:
+            self.player.advance()  # The mixer already switched to it
+        else:
+            self.player.play(self.current.pcm)  # It wasn't ready in time
+        self.queued = False
+        self._fill()
+        return self.current
+
+    def close(self) -> None:
+        """Drops the tracks that haven't been decoded yet."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
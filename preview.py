@@ -0,0 +1,144 @@
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pygame
+from pydub import AudioSegment
+from moviepy.editor import ImageSequenceClip
+from audio_analysis import load_channels, AnalysisStore
+from styles import STYLES, load_style
+
+FRAME_SIZE = 1024
+KEYFRAMES = 12  # Representative moments per track
+BURST = 6  # Consecutive frames rendered at each moment, so the GIF moves
+GIF_FPS = 12
+THUMBNAIL_WIDTH = 240
+SHEET_COLUMNS = 4
+
+# Function to pick evenly spaced moments
+def even_keyframes(store: AnalysisStore, count: int) -> list:
+    """Returns `count` frame indices spread evenly over the track, skipping the very start and end."""
+    if store.frame_count == 0:
+        return []
+    return sorted(set(np.linspace(0, store.frame_count - 1, count + 2)[1:-1].astype(int).tolist()))
+
+# Function to pick the moments where the music hits hardest
+def onset_keyframes(store: AnalysisStore, count: int) -> list:
+    """Returns the `count` frames with the strongest rise in energy, at least a fraction of the track apart."""
+    frame_count = store.frame_count
+    if frame_count < 2:
+        return even_keyframes(store, count)
+
+    # RMS of every frame in one pass over the samples, no per-frame FFT needed
+    samples = store.audio_data[:frame_count * store.frame_size].mean(axis=1)
+    energy = np.sqrt(np.mean(samples.reshape(frame_count, store.frame_size) ** 2, axis=1))
+    log_energy = np.log(energy + 1e-6)
+    onset = np.maximum(np.diff(log_energy, prepend=log_energy[0]), 0.0)
+
+    spacing = max(frame_count // (2 * count), 1)  # Keep the moments spread over the track
+    chosen = []
+    for index in np.argsort(onset)[::-1]:
+        if onset[index] <= 0 or len(chosen) == count:
+            break
+        if all(abs(index - other) >= spacing for other in chosen):
+            chosen.append(int(index))
+    if len(chosen) < count:  # Quiet or flat tracks, fill up with evenly spaced moments
+        chosen += [index for index in even_keyframes(store, count - len(chosen)) if index not in chosen]
+    return sorted(chosen)
+
+# Function to render a few frames of a style at random positions in the track
+def render_keyframes(style: str, store: AnalysisStore, keyframes: list, burst: int, width: int) -> list:
+    """Returns lists of (height, width, 3) thumbnails, one list of `burst` frames per keyframe."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    module = load_style(style)
+    draw = STYLES[style]
+    pygame.init()
+    pygame.display.set_mode((1, 1))  # Styles flip the display, the frames themselves are drawn off-screen
+
+    surface = pygame.Surface((module.SCREEN_WIDTH, module.SCREEN_HEIGHT))
+    height = round(width * module.SCREEN_HEIGHT / module.SCREEN_WIDTH)
+    thumbnail = pygame.Surface((width, height))
+    shots = []
+    for keyframe in keyframes:
+        frames = []
+        for index in range(keyframe, min(keyframe + burst, store.frame_count)):
+            draw(module, surface, store.frame(index), store.time_of(index))
+            pygame.transform.smoothscale(surface, (width, height), thumbnail)
+            frames.append(pygame.surfarray.array3d(thumbnail).transpose(1, 0, 2))
+        shots.append(frames)
+    pygame.quit()
+    return shots
+
+# Function to tile the keyframes into one image
+def write_contact_sheet(shots: list, output_file: str, columns: int = SHEET_COLUMNS) -> None:
+    """Saves the first frame of every shot in a grid."""
+    stills = [frames[0] for frames in shots if frames]
+    height, width, _ = stills[0].shape
+    rows = -(-len(stills) // columns)
+    sheet = np.zeros((rows * height, columns * width, 3), dtype=np.uint8)
+    for position, still in enumerate(stills):
+        row, column = divmod(position, columns)
+        sheet[row * height:(row + 1) * height, column * width:(column + 1) * width] = still
+    pygame.image.save(pygame.surfarray.make_surface(sheet.transpose(1, 0, 2)), output_file)
+
+# Function to animate the keyframes
+def write_gif(shots: list, output_file: str, fps: int = GIF_FPS) -> None:
+    """Saves every shot back to back as an animated GIF."""
+    frames = [frame for frames in shots for frame in frames]
+    ImageSequenceClip(frames, fps=fps).write_gif(output_file, fps=fps, program="imageio", logger=None)
+
+# Function to build the previews of one track
+def preview_track(audio_file: str, style: str, output_dir: str, mode: str = "onset", count: int = KEYFRAMES,
+                  kinds: tuple = ("gif", "sheet"), width: int = THUMBNAIL_WIDTH) -> list:
+    """Renders the keyframes of one track and returns the files it wrote."""
+    audio_segment = AudioSegment.from_file(audio_file)
+    store = AnalysisStore(load_channels(audio_segment), audio_segment.frame_rate, FRAME_SIZE)
+    keyframes = onset_keyframes(store, count) if mode == "onset" else even_keyframes(store, count)
+    if not keyframes:
+        return []
+
+    burst = BURST if "gif" in kinds else 1
+    shots = render_keyframes(style, store, keyframes, burst, width)
+
+    name = os.path.splitext(os.path.basename(audio_file))[0]
+    written = []
+    if "gif" in kinds:
+        written.append(os.path.join(output_dir, f"{name}_preview.gif"))
+        write_gif(shots, written[-1])
+    if "sheet" in kinds:
+        written.append(os.path.join(output_dir, f"{name}_sheet.png"))
+        write_contact_sheet(shots, written[-1])
+    return written
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Renders a preview GIF and contact sheet per track from a few keyframes.")
+    parser.add_argument("tracks", nargs="+", help="Audio files to preview")
+    parser.add_argument("--style", default="audio_visualizer.py", choices=sorted(STYLES), help="Style to render")
+    parser.add_argument("--mode", default="onset", choices=("onset", "even"),
+                        help="Pick the moments with the strongest onsets, or evenly spaced ones")
+    parser.add_argument("--count", type=int, default=KEYFRAMES, help="Keyframes per track")
+    parser.add_argument("--kinds", nargs="+", default=["gif", "sheet"], choices=("gif", "sheet"), help="What to write")
+    parser.add_argument("--width", type=int, default=THUMBNAIL_WIDTH, help="Thumbnail width in pixels")
+    parser.add_argument("--output-dir", default=".", help="Where to write the previews")
+    parser.add_argument("--workers", type=int, default=None, help="Tracks previewed at once (default: one per CPU)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    # Fresh worker processes, SDL doesn't survive being forked from a process that loaded it
+    with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            track: pool.submit(preview_track, track, args.style, args.output_dir, args.mode, args.count,
+                               tuple(args.kinds), args.width)
+            for track in args.tracks
+        }
+        for track, future in futures.items():
+            try:
+                written = future.result()
+                print(f"{track}: {', '.join(written) if written else 'too short to preview'}")
+            except Exception as e:
+                print(f"{track}: An error occurred: {e}")
+
+if __name__ == "__main__":
+    main()
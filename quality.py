@@ -0,0 +1,73 @@
+import time
+from collections import deque
+import pygame
+
+# Class to trade render resolution for frame rate
+class QualityController:
+    """Keeps the render time of a frame under the budget of the target fps.
+
+    With `resolution` set, frames are drawn on an internal surface at `scale` times
+    the window size and upscaled to the window; styles that are bound by the number
+    of primitives rather than by pixels read `detail()` instead. When the recent frame times run over budget the scale
+    steps down, and when there is enough headroom it steps back up. After every
+    change the controller waits for a full window of new samples, so it settles
+    instead of oscillating.
+    """
+
+    def __init__(self, window_size: tuple, fps: int = 30, min_scale: float = 0.5, max_scale: float = 1.0,
+                 step: float = 0.1, window: int = 15, headroom: float = 0.7, resolution: bool = True,
+                 smooth: bool = True) -> None:
+        self.window_size = tuple(window_size)
+        self.budget = 1 / fps
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.headroom = headroom  # Scale up only when frames take less than this share of the budget
+        self.resolution = resolution
+        self.smooth = smooth
+        self.scale = max_scale
+        self.frame_times = deque(maxlen=window)
+        self.surfaces = {}
+        self.started = None
+
+    def size(self) -> tuple:
+        """Returns the internal render size at the current scale."""
+        width, height = self.window_size
+        return (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+
+    def detail(self, count: int, minimum: int = 1) -> int:
+        """Returns `count` (points, dots, ...) reduced in step with the resolution."""
+        return max(minimum, round(count * self.scale))
+
+    def begin(self, screen: pygame.Surface) -> pygame.Surface:
+        """Starts timing a frame and returns the surface to draw it on."""
+        self.started = time.perf_counter()
+        size = self.size()
+        if not self.resolution or size == screen.get_size():
+            return screen  # Full quality, draw straight to the window
+        surface = self.surfaces.get(size)
+        if surface is None:
+            surface = self.surfaces[size] = pygame.Surface(size).convert(screen)
+        return surface
+
+    def end(self, screen: pygame.Surface, surface: pygame.Surface) -> None:
+        """Upscales the frame to the window and records how long it took."""
+        if surface is not screen:
+            if self.smooth:
+                pygame.transform.smoothscale(surface, screen.get_size(), screen)
+            else:
+                pygame.transform.scale(surface, screen.get_size(), screen)
+        self.update(time.perf_counter() - self.started)
+
+    def update(self, frame_time: float) -> None:
+        """Adds one frame time and adjusts the scale once a full window is collected."""
+        self.frame_times.append(frame_time)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return
+        slowest = max(self.frame_times)  # React to spikes, a single slow frame is a visible stutter
+        if slowest > self.budget and self.scale > self.min_scale:
+            self.scale = max(self.min_scale, round(self.scale - self.step, 3))
+            self.frame_times.clear()
+        elif slowest < self.budget * self.headroom and self.scale < self.max_scale:
+            self.scale = min(self.max_scale, round(self.scale + self.step, 3))
+            self.frame_times.clear()
@@ -0,0 +1,19 @@
+import pygame
+
+SEEK_STEP = 5  # Seconds moved by one arrow key press
+FAST_SEEK_STEP = 30  # Seconds moved with Shift held
+
+# Function to turn a key press into a new frame index
+def scrub_position(event: pygame.event.Event, store, index: int):
+    """Returns the frame index to jump to for a scrubbing key, or None for other keys.
+
+    Left/Right move by SEEK_STEP seconds (FAST_SEEK_STEP with Shift), Home jumps to the start.
+    """
+    step = FAST_SEEK_STEP if event.mod & pygame.KMOD_SHIFT else SEEK_STEP
+    if event.key == pygame.K_RIGHT:
+        return store.index_at(store.time_of(index) + step)
+    if event.key == pygame.K_LEFT:
+        return store.index_at(store.time_of(index) - step)
+    if event.key == pygame.K_HOME:
+        return 0
+    return None
@@ -1,17 +1,35 @@
 import numpy as np
 import pygame
-from pydub import AudioSegment
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from sprite_cache import SpriteCache
+from palette import Palette
+from frame_cache import FrameCache
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
 BASE_RADIUS = 50
 MAX_WAVE_RADIUS = 250
 POWER = 1.5
 NUM_DOTS = 50  # Maximum number of dots in the outer circle
 MIN_DOT_RADIUS = 2  # Minimum dot size
 MAX_DOT_RADIUS = 4  # Maximum dot size
+FRAME_CACHE_MB = None  # Memory for whole frames reused when the dot state repeats, None redraws every frame
+
+# Dot placement never changes, only the radius does
+DOT_ANGLES = (2 * np.pi / NUM_DOTS) * np.arange(NUM_DOTS)
+DOT_COS = np.cos(DOT_ANGLES)
+DOT_SIN = np.sin(DOT_ANGLES)
+DOT_SPRITES = SpriteCache()  # Pre-rendered dots, reused across frames
+
+# The dots only react to the energy of the lowest bins
+LOW_BAND = f"low_band_energy:{(FRAME_SIZE // 2) // (NUM_DOTS // 2)}"
+FEATURE_GRAPH = FeatureGraph([LOW_BAND], FRAME_SIZE)
 
 # Function to create a gradient color between cyan and pink
 def get_gradient_color(value: float) -> tuple:
@@ -26,41 +44,49 @@ def get_gradient_color(value: float) -> tuple:
 
     return (r, g, b)
 
-# Function to draw the dots on the outer circle
-def draw_dots_circle(screen: pygame.Surface, samples: np.ndarray) -> None:
-    fft_data = np.fft.fft(samples)
-    fft_magnitude = np.abs(fft_data[:len(fft_data) // 2])
+DOT_PALETTE = Palette(get_gradient_color)  # get_gradient_color baked into a lookup table
+FRAMES = FrameCache(FRAME_CACHE_MB) if FRAME_CACHE_MB else None  # Rendered frames by dot state
+
+# Function to derive the dot parameters of many frames at once
+def dot_parameters(frames: np.ndarray) -> np.ndarray:
+    """Returns a (wave_radius, dot_radius, color_index) row per frame of a (frames, channels, frame_size) block."""
+    # Calculate average magnitude for wave effect
+    average_magnitude = FEATURE_GRAPH.compute(frames)[LOW_BAND]
+    wave_radius = (BASE_RADIUS + (average_magnitude ** POWER) * (MAX_WAVE_RADIUS - BASE_RADIUS)).astype(int)
 
-    # Normalize using logarithmic scaling
-    fft_magnitude = np.log1p(fft_magnitude)
-    max_magnitude = np.max(fft_magnitude)
-    if max_magnitude > 0:
-        fft_magnitude /= max_magnitude
+    # All dots share one radius
+    dot_radius = (MIN_DOT_RADIUS + (wave_radius / MAX_WAVE_RADIUS) * (MAX_DOT_RADIUS - MIN_DOT_RADIUS)).astype(int)
+    return np.column_stack((wave_radius, dot_radius, DOT_PALETTE.indices(average_magnitude)))
 
-    # Clear screen
-    screen.fill((0, 0, 0))
+PRECOMPUTE = {"dots": dot_parameters}  # Derived for the whole track in a few vectorized passes when it loads
 
+# Function to draw the dots on the outer circle
+def draw_dots_circle(screen: pygame.Surface, parameters: np.ndarray) -> None:
+    """Draws one frame from its row of dot_parameters."""
+    wave_radius, dot_radius, color_index = parameters.tolist()
     center_x = SCREEN_WIDTH // 2
     center_y = SCREEN_HEIGHT // 2
 
-    # Calculate average magnitude for wave effect
-    average_magnitude = np.mean(fft_magnitude[:len(fft_magnitude) // (NUM_DOTS // 2)])
-    wave_radius = int(BASE_RADIUS + (average_magnitude ** POWER) * (MAX_WAVE_RADIUS - BASE_RADIUS))
+    # The whole frame follows from the radius and the palette entry
+    state = (wave_radius, color_index)
+    if FRAMES is not None and FRAMES.restore(screen, state):
+        pygame.display.flip()
+        return
 
-    # Calculate dot positions and sizes
-    for i in range(NUM_DOTS):
-        angle = (2 * np.pi / NUM_DOTS) * i
-        dot_radius = MIN_DOT_RADIUS + (wave_radius / MAX_WAVE_RADIUS) * (MAX_DOT_RADIUS - MIN_DOT_RADIUS)
+    # Clear screen
+    screen.fill((0, 0, 0))
 
-        # Calculate dot position
-        x = center_x + (wave_radius * np.cos(angle))
-        y = center_y + (wave_radius * np.sin(angle))
+    # Calculate dot positions
+    xs = (center_x + wave_radius * DOT_COS).astype(int).tolist()
+    ys = (center_y + wave_radius * DOT_SIN).astype(int).tolist()
 
-        # Get gradient color for the dot
-        dot_color = get_gradient_color(average_magnitude)
+    # Get gradient color for the dots
+    dot_color = DOT_PALETTE.color_at(color_index)
 
-        # Draw the dot
-        pygame.draw.circle(screen, dot_color, (int(x), int(y)), int(dot_radius))
+    # Draw every dot from one cached sprite
+    DOT_SPRITES.draw_discs(screen, xs, ys, dot_radius, dot_color)
+    if FRAMES is not None:
+        FRAMES.store(screen, state)
 
     pygame.display.flip()
 
@@ -69,16 +95,9 @@ def main() -> None:
     try:
         # Load the audio file
         audio_file = r"C:\Users\audio.mp3" # Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
-        audio_segment = AudioSegment.from_file(audio_file)
-
-        # Handle stereo audio
-        if audio_segment.channels > 1:
-            audio_data = np.array(audio_segment.get_array_of_samples()).reshape((-1, audio_segment.channels)).mean(axis=1)
-        else:
-            audio_data = np.array(audio_segment.get_array_of_samples())
-
-        audio_data = audio_data.astype(np.float32)
-        audio_data /= np.max(np.abs(audio_data))
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE, precompute=PRECOMPUTE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
 
         # Set up Pygame
         pygame.init()
@@ -86,27 +105,37 @@ def main() -> None:
         pygame.display.set_caption("Circular Dots Audio Spectrum")
         clock = pygame.time.Clock()
 
-        # Initialize Pygame mixer
-        pygame.mixer.init(frequency=audio_segment.frame_rate, channels=audio_segment.channels)
-        pygame.mixer.music.load(audio_file)
-        pygame.mixer.music.play()
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
 
         running = True
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
-
-            # Read a frame of audio data
-            if len(audio_data) >= FRAME_SIZE:
-                frame = audio_data[:FRAME_SIZE]
-                audio_data = audio_data[FRAME_SIZE:]  # Update audio_data
-                draw_dots_circle(screen, frame)
-            else:
-                running = False  # Stop if there are no more audio frames
-
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
+
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                parameters = store.precompute("dots", dot_parameters)[position]  # Derived when the track loaded
+                draw_dots_circle(screen, parameters)
+            elif not playlist.has_next():
+                running = False  # Stop if there are no more audio frames, otherwise wait for the next track
+
+            playlist.update()  # Queue the next track once it is decoded
             clock.tick(30)  # Limit frame rate
 
+        playlist.close()
+        if FRAMES is not None:
+            print(FRAMES.summary())
         pygame.quit()
     except Exception as e:
         print(f"An error occurred: {e}")
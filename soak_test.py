@@ -0,0 +1,153 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+from audio_analysis import AnalysisStore
+from memory_profile import current_rss, MB
+from styles import STYLES, load_style
+
+FRAME_SIZE = 1024
+SAMPLE_RATE = 44100
+FPS = 30  # A frame slower than 1 / FPS counts as dropped
+CHUNK_FRAMES = 256  # Generated audio is produced in chunks of this many frames (~6 s), never as a whole track
+SAMPLE_SECONDS = 60  # Seconds of audio between two samples
+WARMUP_SAMPLES = 3  # Samples ignored while caches fill up
+RSS_TOLERANCE_MB = 32  # Allowed RSS growth over the run
+FRAME_TIME_TOLERANCE = 0.25  # Allowed growth of the median frame time, relative to the start
+FRAME_TIME_FLOOR_MS = 1.0  # Growth below this is jitter, whatever the baseline
+DROP_RATE_TOLERANCE = 0.02  # Allowed growth of the share of dropped frames
+
+# Function to synthesize music-like test audio
+def generated_audio(seconds: float, seed: int = 0):
+    """Yields (CHUNK_FRAMES * FRAME_SIZE, 2) float32 chunks of a drifting chord with beats and noise.
+
+    Loudness, pitch and stereo width all wander over minutes, so the styles see
+    quiet and loud passages instead of one repeated frame.
+    """
+    rng = np.random.default_rng(seed)
+    chunk_size = CHUNK_FRAMES * FRAME_SIZE
+    pitches = np.array([110.0, 220.0, 330.0, 660.0])
+    phases = np.zeros(len(pitches))
+    start = 0
+    while start < seconds * SAMPLE_RATE:
+        t = (start + np.arange(chunk_size)) / SAMPLE_RATE
+        drift = 1 + 0.5 * np.sin(2 * np.pi * t[0] / 300)  # Pitch wanders over five minutes
+        frequencies = pitches * drift
+        steps = 2 * np.pi * frequencies / SAMPLE_RATE
+        tones = np.sin(phases + np.outer(np.arange(chunk_size), steps))
+        phases = (phases + chunk_size * steps) % (2 * np.pi)
+
+        beat = np.exp(-8 * ((t * 2) % 1))  # 120 bpm kick envelope
+        loudness = 0.55 + 0.45 * np.sin(2 * np.pi * t / 97)
+        mono = tones.mean(axis=1) * (0.3 + 0.7 * beat) * loudness + 0.05 * rng.standard_normal(chunk_size)
+        width = 0.3 * np.sin(2 * np.pi * t / 41)
+        chunk = np.stack([mono * (1 + width), mono * (1 - width)], axis=1)
+        yield np.clip(chunk, -1, 1).astype(np.float32)
+        start += chunk_size
+
+# Function to fit the growth of a metric over the run
+def trend(times: list, values: list) -> float:
+    """Returns the least-squares change of `values` from the first to the last sample."""
+    if len(values) < 2:
+        return 0.0
+    slope = np.polyfit(times, values, 1)[0]
+    return float(slope * (times[-1] - times[0]))
+
+# Function to soak one style
+def soak_style(file_name: str, hours: float) -> dict:
+    """Renders `hours` of generated audio through one style as fast as possible and samples it over time."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    module = load_style(file_name)
+    draw = STYLES[file_name]
+    pygame = module.pygame
+    pygame.init()
+    screen = pygame.display.set_mode((module.SCREEN_WIDTH, module.SCREEN_HEIGHT))
+
+    budget = 1 / FPS
+    samples = []
+    frame_times = []
+    audio_time = 0.0
+    next_sample = SAMPLE_SECONDS
+    for chunk in generated_audio(hours * 3600):
+        store = AnalysisStore(chunk, SAMPLE_RATE, FRAME_SIZE)
+        for index in range(store.frame_count):
+            pygame.event.pump()  # Keep the window responsive, as the main loops do
+            started = time.perf_counter()
+            draw(module, screen, store.frame(index), audio_time)
+            frame_times.append(time.perf_counter() - started)
+            audio_time += FRAME_SIZE / SAMPLE_RATE
+
+            if audio_time >= next_sample:
+                frame_ms = np.array(frame_times) * 1000
+                samples.append({
+                    "audio_seconds": round(audio_time, 3),
+                    "rss_mb": current_rss() / MB,
+                    "frame_ms_median": float(np.median(frame_ms)),
+                    "frame_ms_p95": float(np.percentile(frame_ms, 95)),
+                    "drop_rate": float(np.mean(frame_ms > budget * 1000)),
+                })
+                frame_times.clear()
+                next_sample += SAMPLE_SECONDS
+    pygame.quit()
+    return {"style": file_name, "hours": hours, "samples": samples, **check_trends(samples)}
+
+# Function to decide whether a style stayed flat
+def check_trends(samples: list) -> dict:
+    """Returns the fitted growth of each metric and the ones that grew beyond their tolerance."""
+    steady = samples[WARMUP_SAMPLES:] if len(samples) > WARMUP_SAMPLES + 1 else samples
+    times = [sample["audio_seconds"] for sample in steady]
+    growth = {
+        "rss_mb": trend(times, [sample["rss_mb"] for sample in steady]),
+        "frame_ms_median": trend(times, [sample["frame_ms_median"] for sample in steady]),
+        "drop_rate": trend(times, [sample["drop_rate"] for sample in steady]),
+    }
+    failures = []
+    if growth["rss_mb"] > RSS_TOLERANCE_MB:
+        failures.append(f"RSS grew {growth['rss_mb']:.1f} MB (tolerance {RSS_TOLERANCE_MB} MB)")
+    if steady:
+        baseline = max(steady[0]["frame_ms_median"], 0.1)
+        if growth["frame_ms_median"] > max(FRAME_TIME_TOLERANCE * baseline, FRAME_TIME_FLOOR_MS):
+            failures.append(f"median frame time grew {growth['frame_ms_median']:.2f} ms from {baseline:.2f} ms "
+                            f"(tolerance {FRAME_TIME_TOLERANCE:.0%})")
+    if growth["drop_rate"] > DROP_RATE_TOLERANCE:
+        failures.append(f"dropped frames grew by {growth['drop_rate']:.1%} of frames "
+                        f"(tolerance {DROP_RATE_TOLERANCE:.0%})")
+    return {"growth": growth, "failures": failures}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Feeds hours of generated audio through the styles headlessly "
+                                                 "and fails if memory, frame time or dropped frames trend upward.")
+    parser.add_argument("styles", nargs="*", default=sorted(STYLES), help="Style scripts to soak (default: all)")
+    parser.add_argument("--hours", type=float, default=3.0, help="Hours of audio per style")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Styles soaked at once; more than one skews the frame times")
+    parser.add_argument("--report", default="soak_report.json", help="Where to write the samples")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.styles if name not in STYLES]
+    if unknown:
+        parser.error(f"Unknown styles: {', '.join(unknown)}")
+
+    # A fresh process per style, so one style's memory never shows up in another's samples
+    with multiprocessing.Pool(args.workers, maxtasksperchild=1) as pool:
+        results = pool.starmap(soak_style, [(name, args.hours) for name in args.styles], chunksize=1)
+
+    with open(args.report, "w") as report_out:
+        json.dump(results, report_out, indent=2)
+
+    for result in results:
+        status = "FAIL" if result["failures"] else "ok"
+        last = result["samples"][-1] if result["samples"] else {}
+        print(f"{status:4} {result['style']}: {last.get('rss_mb', 0):.0f} MB, "
+              f"{last.get('frame_ms_median', 0):.2f} ms median frame")
+        for failure in result["failures"]:
+            print(f"     {failure}")
+    print(f"Samples saved as {args.report}.")
+    sys.exit(1 if any(result["failures"] for result in results) else 0)
+
+if __name__ == "__main__":
+    main()
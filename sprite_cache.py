@@ -0,0 +1,57 @@
+from collections import OrderedDict
+import pygame
+import pygame.gfxdraw
+
+# Class to keep pre-rendered disc sprites between frames
+class SpriteCache:
+    """Caches disc surfaces keyed by (radius, color) with least-recently-used eviction.
+
+    Colors are kept exact, so a cached disc is identical to drawing it directly;
+    the styles pick colors from a baked Palette, which bounds how many there are.
+    """
+
+    def __init__(self, max_entries: int = 256, antialias: bool = False) -> None:
+        self.max_entries = max_entries
+        self.antialias = antialias
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _render(self, radius: int, color: tuple) -> pygame.Surface:
+        """Draws one disc on a transparent surface."""
+        sprite = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        if self.antialias:
+            pygame.gfxdraw.aacircle(sprite, radius, radius, radius, color)
+            pygame.gfxdraw.filled_circle(sprite, radius, radius, radius, color)
+        else:
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+        return sprite
+
+    def get(self, radius: int, color: tuple) -> pygame.Surface:
+        """Returns the sprite for a disc, rendering it on a miss."""
+        key = (radius, tuple(int(c) for c in color[:3]))
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        sprite = self._render(radius, key[1])
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last=False)  # Evict the least recently used sprite
+        return sprite
+
+    def draw_discs(self, screen: pygame.Surface, xs, ys, radius: int, color: tuple) -> None:
+        """Draws same-sized discs centered on (xs, ys) with a single blits call."""
+        if radius < 1:
+            return
+        sprite = self.get(radius, color)
+        screen.blits([(sprite, (x - radius, y - radius)) for x, y in zip(xs, ys)], doreturn=False)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
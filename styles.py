@@ -0,0 +1,32 @@
+import importlib.util
+import os
+import numpy as np
+
+# How each style draws one frame, mirroring its main loop
+STYLES = {
+    "audio_visualizer.py": lambda m, screen, frame, t: (
+        m.draw_dots_circle(screen, m.dot_parameters(frame[np.newaxis])[0]), m.pygame.display.flip()),
+    "circle and line.py": lambda m, screen, frame, t: (
+        m.SCENE.render(screen, np.atleast_2d(m.FEATURE_GRAPH.compute(frame)["low_spectrum"])), m.pygame.display.flip()),
+    "circle color changing.py": lambda m, screen, frame, t: m.draw_circular_spectrum(screen, frame, m.CIRCLE_PALETTE.color(t), t),
+    "circle spectrum.py": lambda m, screen, frame, t: (
+        m.SCENE.render(screen, m.FEATURE_GRAPH.compute(frame)["low_spectrum"]), m.pygame.display.flip()),
+    "circle,with sine waves.py": lambda m, screen, frame, t: m.draw_circular_sine_waves(screen, m.wave_levels(frame[np.newaxis])[0], t),
+    "conc circle dots.py": lambda m, screen, frame, t: m.draw_dots_circle(screen, m.dot_parameters(frame[np.newaxis])[0]),
+    "hashplay.py": lambda m, screen, frame, t: m.draw_char_grid(screen, frame),
+    "line _ audio_visualizer.py": lambda m, screen, frame, t: m.draw_line_spectrum(screen, frame, t),
+    "line type 2.py": lambda m, screen, frame, t: (
+        screen.fill((0, 0, 0)), m.draw_bars(screen, m.FEATURE_GRAPH.compute(frame)["low_spectrum"]), m.pygame.display.flip()),
+    "one dot one ring.py": lambda m, screen, frame, t: m.draw_dots_circle(screen, m.dot_parameters(frame[np.newaxis])[0]),
+    "small conc circl.py": lambda m, screen, frame, t: m.draw_dots_circle(screen, m.dot_parameters(frame[np.newaxis])[0]),
+    "waterfall spectrum.py": lambda m, screen, frame, t: m.draw_waterfall(screen, frame),
+}
+
+# Function to import a style script by its file name
+def load_style(file_name: str):
+    """Returns the style script as a module, without running its main loop."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name)
+    spec = importlib.util.spec_from_file_location(os.path.splitext(file_name)[0].replace(" ", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,33 @@
+import time
+import numpy as np
+import pytest
+from background_export import BackgroundExport
+
+SIZE = (64, 48)
+
+# Draws a frame from its analysis, module-level so the spawned renderer can import it
+def draw_gray(surface, level) -> None:
+    surface.fill((int(level), int(level), int(level)))
+
+def test_dead_encoder_stops_submit(tmp_path):
+    export = BackgroundExport(draw_gray, SIZE, "/nonexistent_dir/out.mp4")
+    try:
+        deadline = time.time() + 30
+        with pytest.raises(RuntimeError, match="encode process"):
+            while time.time() < deadline:  # The encoder dies once ffmpeg refuses the path
+                export.submit(np.int64(128))
+                time.sleep(0.01)
+        assert export.finish() is False
+    finally:
+        export.cancel()
+    assert not export.render_process.is_alive()
+    assert not export.encode_process.is_alive()
+
+def test_export_writes_every_frame(tmp_path):
+    output = tmp_path / "frames"
+    export = BackgroundExport(draw_gray, SIZE, str(output), export_format="raw")
+    for level in range(10):
+        export.submit(level * 20)
+    assert export.finish() is True, (export.render_process.exitcode, export.encode_process.exitcode)
+    export.cancel()  # Harmless once finished
+    assert len(list(output.glob("frame_*.raw"))) == 10
@@ -0,0 +1,97 @@
+import socket
+import threading
+import time
+import numpy as np
+import pytest
+from band_publisher import BandPublisher, BeatDetector, HEADER, pack_message, unpack_message
+
+KICK = [0.4, 0.7, 0.9, 0.6, 0.3]  # Bass energy of one kick, still rising over its first frames
+BASELINE = 0.1
+
+# Function to build a kick train of band frames
+def kick_train(kicks: int, interval: float, fps: int) -> list:
+    """Returns (seconds, bands) for every frame, with a kick starting every `interval` seconds."""
+    frame_count = int(kicks * interval * fps)
+    energy = np.full(frame_count, BASELINE)
+    for kick in range(kicks):
+        start = round(kick * interval * fps)
+        energy[start:start + len(KICK)] = KICK
+    return [(i / fps, np.array([level, level, 0.2, 0.1])) for i, level in enumerate(energy)]
+
+@pytest.mark.parametrize("fps", [30, 43, 60])
+def test_one_beat_per_kick(fps):
+    detector = BeatDetector()
+    beats = [seconds for seconds, bands in kick_train(16, 0.5, fps) if detector.update(bands, seconds)]
+
+    assert len(beats) == 16
+    assert np.allclose(np.diff(beats), 0.5, atol=1.5 / fps)
+
+def test_history_spans_seconds_not_frames():
+    detector = BeatDetector(history=1.0)
+    for i in range(120):
+        detector.update(np.full(4, BASELINE), i / 60)
+    assert len(detector.energies) == 60
+
+def test_seek_back_restarts_the_history():
+    detector = BeatDetector()
+    assert detector.update(np.full(4, BASELINE), 5.0) is False
+    assert detector.update(np.full(4, 0.9), 5.05) is True
+    assert detector.update(np.full(4, BASELINE), 1.0) is False  # Earlier than the last beat
+    assert detector.update(np.full(4, 0.9), 1.05) is True
+
+def test_message_round_trip():
+    bands = np.linspace(0, 1, 16)
+    frame, seconds, beat, unpacked = unpack_message(pack_message(7, 1.5, bands, True))
+    assert (frame, seconds, beat) == (7, 1.5, True)
+    assert np.allclose(unpacked, bands, atol=1 / 255)
+
+# Function to read whole messages from a plain TCP subscription
+def read_messages(connection: socket.socket, received: list) -> None:
+    buffer = b""
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            return
+        buffer += chunk
+        while len(buffer) >= HEADER.size:
+            length = HEADER.size + buffer[HEADER.size - 1]  # The band count is the last header byte
+            if len(buffer) < length:
+                break
+            received.append(unpack_message(buffer[:length]))
+            buffer = buffer[length:]
+
+def test_slow_subscriber_is_dropped_and_fast_one_keeps_up():
+    publisher = BandPublisher(port=0)
+    fast = socket.create_connection(("127.0.0.1", publisher.port))
+    stalled = socket.socket()
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)  # Fills up after a few messages
+    stalled.connect(("127.0.0.1", publisher.port))
+    received = []
+    reader = threading.Thread(target=read_messages, args=(fast, received), daemon=True)
+    reader.start()
+    try:
+        deadline = time.time() + 10
+        while publisher.subscriber_count < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert publisher.subscriber_count == 2
+
+        # Publish until the stalled subscriber has been dropped, which publish() must never wait on
+        bands = np.linspace(0, 1, 200)
+        published = 0
+        while publisher.dropped == 0 and time.time() < deadline:
+            started = time.perf_counter()
+            publisher.publish(bands, seconds=published / 30)
+            assert time.perf_counter() - started < 0.05
+            published += 1
+            time.sleep(0.002)
+        assert publisher.dropped == 1
+        assert publisher.subscriber_count == 1
+    finally:
+        publisher.close()
+        reader.join(5)
+        fast.close()
+        stalled.close()
+
+    # The fast subscriber got every message, in order, stamped with the given time
+    assert [frame for frame, _, _, _ in received] == list(range(published))
+    assert [seconds for _, seconds, _, _ in received] == pytest.approx([i / 30 for i in range(published)])
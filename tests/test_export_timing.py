@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+from audio_visualizer import FPS, FRAME_SIZE, video_store
+
+@pytest.mark.parametrize("sample_rate", [22050, 32000, 44100, 48000])
+def test_video_covers_the_audio(sample_rate):
+    duration = 20.0
+    audio_data = np.zeros((int(duration * sample_rate), 2), dtype=np.float32)
+    store = video_store(audio_data, sample_rate)
+
+    # One analysis frame per video frame, the last one may miss less than a frame's worth of audio
+    assert abs(store.frame_count / FPS - duration) <= 1 / FPS + FRAME_SIZE / sample_rate
+
+@pytest.mark.parametrize("sample_rate", [32000, 44100])
+def test_frame_shows_its_own_time(sample_rate):
+    audio_data = np.zeros((10 * sample_rate, 1), dtype=np.float32)
+    store = video_store(audio_data, sample_rate)
+
+    for index in range(store.frame_count):
+        assert store.time_of(index) == pytest.approx(index / FPS)
+        assert store.index_at(index / FPS + 0.5 / FPS) == index
+    assert store.frames().shape == (store.frame_count, 1, FRAME_SIZE)
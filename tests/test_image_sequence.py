@@ -0,0 +1,22 @@
+import json
+import os
+import numpy as np
+from audio_visualizer import FPS, video_store
+from image_sequence import ImageSequenceWriter
+
+def test_index_times_match_the_analysis_store(tmp_path):
+    sample_rate = 44100
+    store = video_store(np.zeros((5 * sample_rate, 2), dtype=np.float32), sample_rate)
+    position = store.index_at(1.3)
+    size = (4, 2)
+
+    with ImageSequenceWriter(str(tmp_path), size, FPS, "raw", store.time_of(position)) as writer:
+        for _ in range(position, store.frame_count):
+            writer.write_frame(np.zeros((2, 4, 3), dtype=np.uint8))
+
+    with open(os.path.join(tmp_path, "index.json")) as index_in:
+        frames = json.load(index_in)["frames"]
+    assert len(frames) == store.frame_count - position
+    for entry in frames:
+        assert entry["time"] == round(store.time_of(position + entry["frame"]), 6)
+        assert os.path.exists(os.path.join(tmp_path, entry["file"]))
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+import time
+import pytest
+from memory_profile import MemoryProfiler, MemoryBudgetExceeded, current_rss, children_rss
+
+def test_budget_stops_a_running_stage(tmp_path):
+    profiler = MemoryProfiler(enabled=True, budget_mb=1, report_file=str(tmp_path / "memory_report.json"))
+    stopped = []
+    profiler.on_exceeded(lambda: stopped.append(True))
+    finished = False
+    start = time.perf_counter()
+    with pytest.raises(MemoryBudgetExceeded, match="'long wait'"):
+        with profiler.stage("long wait"):
+            while time.perf_counter() - start < 10:  # Stands in for an export drain
+                time.sleep(0.01)
+            finished = True
+
+    assert not finished
+    assert time.perf_counter() - start < 5
+    assert stopped == [True]
+    assert (tmp_path / "memory_report.json").exists()
+
+def test_stage_without_budget_runs_to_the_end():
+    profiler = MemoryProfiler(enabled=True)
+    with profiler.stage("work"):
+        time.sleep(0.3)
+    assert profiler.stages["work"]["calls"] == 1
+    assert profiler.stages["work"]["max_total_rss_bytes"] >= current_rss() // 2
+
+def test_children_rss_counts_child_processes():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        time.sleep(0.5)
+        assert children_rss() > 0
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,82 @@
+import time
+from types import SimpleNamespace
+import pygame
+import pytest
+import playback
+from playback import PcmPlayer, SWITCH_TOLERANCE
+
+SAMPLE_RATE = 44100
+
+# Function to make silent 16-bit stereo PCM
+def silence(seconds: float) -> bytes:
+    return bytes(4 * int(seconds * SAMPLE_RATE))
+
+# Class standing in for the mixer channel, so the test decides when it is busy
+class FakeChannel:
+    def __init__(self) -> None:
+        self.busy = False
+
+    def play(self, sound) -> None:
+        self.busy = True
+
+    def queue(self, sound) -> None:
+        pass
+
+    def set_endevent(self, event_type=None) -> None:
+        pass
+
+    def get_busy(self) -> bool:
+        return self.busy
+
+@pytest.fixture
+def player():
+    player = PcmPlayer(SAMPLE_RATE, 2)
+    yield player
+    pygame.mixer.quit()
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(playback, "time", SimpleNamespace(perf_counter=lambda: now[0]))
+    return now
+
+def test_position_allows_for_the_output_latency(player, clock):
+    player.channel = FakeChannel()
+    player.play(silence(2.0), start=0.5)
+    assert player.position() == 0.5  # Nothing has been heard yet
+
+    clock[0] += 1.0
+    assert player.position() == pytest.approx(1.5 - player.latency)
+
+    player.channel.busy = False  # The mixer ran out before the clock did
+    assert player.position() == pytest.approx(2.0)
+
+def test_advance_anchors_on_the_switch(player, clock):
+    player.channel = FakeChannel()
+    player.play(silence(1.0))
+    player.queue(silence(3.0))
+
+    # MUSIC_END handled a frame after the switch, the clock keeps the switch itself
+    clock[0] += 1.0 + SWITCH_TOLERANCE / 2
+    player.advance()
+    assert player.started == pytest.approx(101.0)
+
+    # Handled long after the predicted switch, the mixer fell behind, so the event wins
+    player.queue(silence(1.0))
+    clock[0] += 3.0 + 4 * SWITCH_TOLERANCE
+    player.advance()
+    assert player.started == clock[0]
+    assert player.position() == 0.0
+
+def test_position_follows_the_mixer(player):
+    duration = 0.5
+    player.play(silence(duration))
+    last = 0.0
+    start = time.perf_counter()
+    while player.channel.get_busy() and time.perf_counter() - start < 5:
+        last = player.position()
+        time.sleep(0.002)
+
+    assert not player.channel.get_busy()
+    assert duration - last < 0.1  # The clock had nearly reached the end when the mixer did
+    assert player.position() == duration
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pygame
+
+TILE_SIZE = 512  # Tile edge in pixels, a 4K frame is 8 x 5 tiles
+
+# Function to split a frame into tiles
+def tile_rects(size: tuple, tile_size: int = TILE_SIZE) -> list:
+    """Returns the Rects covering a surface of `size`, row by row, clipped at the right and bottom edges."""
+    width, height = size
+    return [pygame.Rect(x, y, min(tile_size, width - x), min(tile_size, height - y))
+            for y in range(0, height, tile_size) for x in range(0, width, tile_size)]
+
+# Class to rasterize large frames on every core
+class TileRenderer:
+    """Draws one frame's blits as tiles on a thread pool, straight into the frame's own pixels.
+
+    Each tile is a subsurface of the target, so the threads write into one shared
+    buffer and nothing is copied back. A blit is only sent to the tiles its
+    sprite overlaps, so a tile with nothing on it costs one fill. pygame releases
+    the GIL while it fills and blits, which is where the time goes at 4K and 8K.
+    The pool is started on first use, so the renderer can be created before the
+    render process is started.
+    """
+
+    def __init__(self, tile_size: int = TILE_SIZE, workers: int = None) -> None:
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 4
+        self.pool = None
+
+    def _draw_tile(self, rect: pygame.Rect, tile: pygame.Surface, background: tuple, blits: list) -> None:
+        """Fills one tile and draws the blits that reach it, shifted into the tile's coordinates."""
+        tile.fill(background)
+        if blits:
+            tile.blits([(sprite, (x - rect.x, y - rect.y)) for sprite, (x, y) in blits], doreturn=False)
+
+    def render(self, surface: pygame.Surface, background: tuple, blits: list) -> None:
+        """Fills the surface with `background` and draws the (sprite, (x, y)) blits, one tile per task."""
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+
+        # Bounding boxes of every blit, culled against each tile in one vectorized test
+        boxes = np.array([(x, y, x + sprite.get_width(), y + sprite.get_height()) for sprite, (x, y) in blits],
+                         dtype=np.int64).reshape(-1, 4)
+        tasks = []
+        for rect in tile_rects(surface.get_size(), self.tile_size):
+            visible = np.flatnonzero((boxes[:, 0] < rect.right) & (boxes[:, 2] > rect.x)
+                                     & (boxes[:, 1] < rect.bottom) & (boxes[:, 3] > rect.y))
+            tasks.append(self.pool.submit(self._draw_tile, rect, surface.subsurface(rect), background,
+                                          [blits[i] for i in visible]))
+        for task in tasks:
+            task.result()  # Waits for the whole frame and raises a tile's error here
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
@@ -0,0 +1,122 @@
+import re
+import subprocess
+import numpy as np
+from moviepy.config import get_setting
+
+COPYABLE_AUDIO_CODECS = ("aac", "mp3", "alac", "ac3", "eac3")  # Fit an MP4 as they are
+AUDIO_CODEC = "aac"  # Used when the source audio has to be encoded
+AUDIO_BITRATE = "192k"
+
+# BT.601 limited range, the same matrix ffmpeg uses by default for rgb24 -> yuv420p
+LUMA_WEIGHTS = np.array([0.257, 0.504, 0.098], dtype=np.float32)
+CHROMA_WEIGHTS = np.array([[-0.148, 0.439], [-0.291, -0.368], [0.439, -0.071]], dtype=np.float32) / 4  # Over 2x2 sums
+
+# Function to convert an RGB frame to planar YUV 4:2:0
+def rgb_to_yuv420(frame: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Returns the Y plane followed by the half-resolution U and V planes of an even-sized (height, width, 3) frame.
+
+    Half the bytes of the RGB frame, and ffmpeg no longer has to convert it.
+    """
+    height, width, _ = frame.shape
+    pixels = height * width
+    if out is None:
+        out = np.empty(pixels * 3 // 2, dtype=np.uint8)
+
+    rgb = frame.astype(np.float32)
+    luma = rgb @ LUMA_WEIGHTS
+    luma += 16.5  # Offset plus 0.5, so the cast below rounds
+    np.copyto(out[:pixels].reshape(height, width), luma, casting="unsafe")
+
+    # Chroma from the sum of each 2x2 block
+    block = rgb[0::2, 0::2] + rgb[1::2, 0::2]
+    block += rgb[0::2, 1::2]
+    block += rgb[1::2, 1::2]
+    chroma = block @ CHROMA_WEIGHTS
+    chroma += 128.5
+    quarter = pixels // 4
+    np.copyto(out[pixels:pixels + quarter].reshape(height // 2, width // 2), chroma[..., 0], casting="unsafe")
+    np.copyto(out[pixels + quarter:].reshape(height // 2, width // 2), chroma[..., 1], casting="unsafe")
+    return out
+
+# Function to find the codec of the first audio stream in a file
+def probe_audio_codec(audio_file: str):
+    """Returns the codec name of the first audio stream, or None when there is none."""
+    result = subprocess.run([get_setting("FFMPEG_BINARY"), "-hide_banner", "-i", audio_file],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    match = re.search(r"Stream #\S+.*?: Audio: (\w+)", result.stderr)
+    return match.group(1) if match else None
+
+# Class to stream frames into ffmpeg one at a time
+class VideoWriter:
+    """Writes frames to an ffmpeg process instead of collecting them in memory.
+
+    With `planar` set (and an even frame size), frames are converted to YUV 4:2:0
+    here and piped at half the size, so the conversion runs on the caller's core
+    instead of ffmpeg's. Otherwise RGB is piped and ffmpeg converts it.
+
+    With `audio_file` set, its audio is muxed in by the same ffmpeg pass, starting
+    `audio_offset` seconds into the track so it lines up with the first frame. The
+    audio stream is copied untouched when the container takes its codec, otherwise
+    it is encoded once. The output ends with whichever of the streams ends first.
+    """
+
+    def __init__(self, output_file: str, size: tuple, fps: int = 30, codec: str = "libx264",
+                 audio_file: str = None, audio_offset: float = 0.0, planar: bool = False) -> None:
+        width, height = size
+        self.size = size
+        self.planar = planar and width % 2 == 0 and height % 2 == 0  # 4:2:0 needs whole 2x2 blocks
+        self.yuv = np.empty(width * height * 3 // 2, dtype=np.uint8) if self.planar else None
+        command = [
+            get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "yuv420p" if self.planar else "rgb24",
+            "-s", f"{width}x{height}", "-r", str(fps),
+            "-i", "-",
+        ]
+        audio_codec = probe_audio_codec(audio_file) if audio_file else None
+        if audio_codec is None:
+            command += ["-an"]
+        else:
+            copy = audio_codec in COPYABLE_AUDIO_CODECS
+            command += [
+                "-ss", f"{audio_offset:.6f}", "-i", audio_file,  # Input seek, so nothing before it is decoded
+                "-map", "0:v:0", "-map", "1:a:0",
+                *(["-c:a", "copy"] if copy else ["-c:a", AUDIO_CODEC, "-b:a", AUDIO_BITRATE]),
+                "-shortest",
+            ]
+        command += ["-c:v", codec, "-pix_fmt", "yuv420p", output_file]
+        self.output_file = output_file
+        self.audio_codec = audio_codec
+        self.frame_count = 0
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write_frame(self, frame) -> None:
+        """Writes one (height, width, 3) uint8 frame or its raw RGB bytes."""
+        if self.planar:
+            width, height = self.size
+            rgb = np.frombuffer(frame, dtype=np.uint8) if not isinstance(frame, np.ndarray) else frame
+            frame = rgb_to_yuv420(rgb.reshape((height, width, 3)), self.yuv)
+        elif isinstance(frame, np.ndarray):
+            frame = memoryview(np.ascontiguousarray(frame, dtype=np.uint8)).cast("B")
+        self.process.stdin.write(frame)
+        self.frame_count += 1
+
+    def close(self) -> None:
+        """Flushes the remaining frames and waits for ffmpeg to finish the file."""
+        if self.process.stdin and not self.process.stdin.closed:
+            self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed to write {self.output_file}")
+
+    def cancel(self) -> None:
+        """Stops ffmpeg without finishing the file."""
+        self.process.kill()
+        self.process.wait()
+
+    def __enter__(self) -> "VideoWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.cancel()
@@ -0,0 +1,102 @@
+import numpy as np
+import pygame
+from feature_graph import FeatureGraph
+from scrubbing import scrub_position
+from playlist import Playlist, MUSIC_END
+from palette import Palette
+
+# Constants
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+FRAME_SIZE = 1024
+START_TIME = 0  # Seconds into the track where playback and rendering start
+PLAYLIST = []  # More audio files to play after the first one, without a gap
+NUM_BANDS = 120  # Log-spaced frequency bands, lowest at the bottom
+COLUMN_WIDTH = 2  # Pixels each frame moves the history left, the window shows SCREEN_WIDTH // COLUMN_WIDTH frames
+POWER = 0.5  # Lifts quiet bands so the history isn't mostly black
+
+# The waterfall only needs the band energies of each frame
+BANDS = f"log_bands:{NUM_BANDS}"
+FEATURE_GRAPH = FeatureGraph([BANDS], FRAME_SIZE)
+
+# Band shown on every pixel row, the bottom row is the lowest band
+ROW_BANDS = (np.arange(SCREEN_HEIGHT)[::-1] * NUM_BANDS) // SCREEN_HEIGHT
+
+# Function to create a heat color from a band energy
+def get_heat_color(value: float) -> tuple:
+    """Returns a color from black through blue and magenta to yellow based on the input value."""
+    r = int(255 * min(max(value * 2 - 0.5, 0), 1))
+    g = int(255 * min(max(value * 2 - 1, 0), 1))
+    b = int(255 * min(value * 3, 1) * max(1 - max(value - 0.66, 0) * 3, 0))
+    return (r, g, b)
+
+HEAT_PALETTE = Palette(get_heat_color)  # get_heat_color baked into a lookup table
+COLUMN = pygame.Surface((COLUMN_WIDTH, SCREEN_HEIGHT))  # The newest frame, written once and blitted
+
+# Function to draw the waterfall
+def draw_waterfall(screen: pygame.Surface, samples: np.ndarray) -> None:
+    """Moves the history on the screen one column left and draws the newest frame at the right edge.
+
+    The screen itself holds the history, so each frame costs one in-place scroll
+    and one column, however many frames are visible.
+    """
+    levels = FEATURE_GRAPH.compute(samples)[BANDS] ** POWER
+
+    # One palette lookup per band, spread over the rows and the column's width
+    column_colors = HEAT_PALETTE.map(levels)[ROW_BANDS]
+    pygame.surfarray.blit_array(COLUMN, np.broadcast_to(column_colors, (COLUMN_WIDTH, *column_colors.shape)))
+
+    screen.scroll(-COLUMN_WIDTH, 0)
+    screen.blit(COLUMN, (screen.get_width() - COLUMN_WIDTH, 0))
+
+    pygame.display.flip()
+
+# Main loop
+def main() -> None:
+    """Runs the main loop."""
+    try:
+        # Load the audio file
+        audio_file = r"C:\Users\audio.mp3" # Replace r"C:\Users\audio.mp3" with your audio file path (Ctrl+Shift+C to copy).
+        playlist = Playlist([audio_file, *PLAYLIST], FRAME_SIZE)  # The next tracks are decoded in the background
+        store = playlist.current.store  # Frames are looked up by time
+        position = store.index_at(START_TIME)
+
+        # Set up Pygame
+        pygame.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("Waterfall Spectrum")
+        clock = pygame.time.Clock()
+
+        # Play the decoded samples, the mixer was opened at the track's own format
+        playlist.play(store.time_of(position))
+
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == MUSIC_END and playlist.has_next():  # The mixer moved on to the next track
+                    store = playlist.advance().store
+                    position = 0
+                elif event.type == pygame.KEYDOWN:
+                    new_position = scrub_position(event, store, position)
+                    if new_position is not None:  # Jump the renderer and the music together
+                        position = new_position
+                        playlist.seek(store.time_of(position))
+
+            # Read the frame being played, so the visuals follow the audio clock
+            position = store.index_at(playlist.position())
+            if position < store.frame_count:
+                frame = store.frame(position)
+                draw_waterfall(screen, frame)
+
+            playlist.update()  # Queue the next track once it is decoded
+            clock.tick(30)  # Limit frame rate
+
+        playlist.close()
+        pygame.quit()
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+if __name__ == "__main__":
+    main()